@@ -0,0 +1,220 @@
+"""Cache semântico de respostas de FAQ a partir de perguntas/respostas curadas.
+
+O rag-search.js compara toda consulta com a coleção expert_knowledge antes da
+busca geral. Este módulo gera um faq_index.json compacto com as perguntas
+canônicas (e paráfrases) já embutidas e um limiar de similaridade por entrada;
+FaqIndex.match() devolve a resposta pronta quando a consulta passa do limiar,
+pulando recuperação e geração.
+
+Entrada: JSON (lista ou {"entries": [...]}) ou JSONL, por exemplo o resultado de
+    mongoexport --collection expert_knowledge --out expert_knowledge.jsonl
+Cada item: question, answer, e opcionalmente paraphrases, threshold, tags, category,
+priority e embedding (reaproveitado se for do mesmo modelo).
+
+Uso:
+    python faq_index.py --input expert_knowledge.jsonl --output faq_index.json
+    python faq_index.py --input faq.json --dry-run
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from kb_build import MODEL_NAME, add_embedding_arguments, content_hash, create_provider, provider_from_args
+from kb_embeddings import EmbeddingError, EmbeddingProvider
+
+DEFAULT_FAQ_OUTPUT = Path("faq_index.json")
+DEFAULT_THRESHOLD = 0.85  # mesmo EXPERT_THRESHOLD do rag-search.js
+
+
+def load_curated_entries(paths: Sequence[Path]) -> List[dict]:
+    entries: List[dict] = []
+    for path in paths:
+        text = path.read_text(encoding="utf-8").strip()
+        if path.suffix == ".jsonl":
+            items = [json.loads(line) for line in text.splitlines() if line.strip()]
+        else:
+            raw = json.loads(text) if text else []
+            items = raw.get("entries", []) if isinstance(raw, dict) else raw
+        for item in items:
+            question = str(item.get("question") or "").strip()
+            answer = str(item.get("answer") or "").strip()
+            if question and answer:
+                entries.append(item)
+    return entries
+
+
+def _entry_id(item: dict) -> str:
+    raw_id = item.get("id") or item.get("_id")
+    if isinstance(raw_id, dict):  # Extended JSON do mongoexport: {"$oid": "..."}
+        raw_id = raw_id.get("$oid")
+    return str(raw_id or content_hash(item["question"].strip())[:16])
+
+
+def _encode(matrix: np.ndarray) -> str:
+    return base64.b64encode(matrix.astype("<f2").tobytes()).decode("ascii")
+
+
+def _decode(data: str, rows: int, dim: int) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype="<f2").reshape(rows, dim).astype(np.float32)
+
+
+def _previous_vectors(output_path: Path) -> Dict[str, List[float]]:
+    """Vetores já calculados numa execução anterior, indexados pelo hash do texto."""
+    if not output_path.exists():
+        return {}
+    try:
+        raw = json.loads(output_path.read_text(encoding="utf-8"))
+        vectors = raw["vectors"]
+        if raw.get("model") != MODEL_NAME or not vectors["rows"]:
+            return {}
+        matrix = _decode(vectors["data"], len(vectors["rows"]), vectors["dim"])
+        return {text_hash: matrix[idx].tolist() for idx, text_hash in enumerate(vectors["hashes"])}
+    except (json.JSONDecodeError, KeyError, ValueError):
+        return {}
+
+
+def build_faq_index(
+    inputs: Sequence[Path],
+    output_path: Path,
+    default_threshold: float,
+    batch_size: int,
+    dry_run: bool,
+    provider: Optional[EmbeddingProvider] = None,
+    concurrency: int = 1,
+) -> dict:
+    items = load_curated_entries(inputs)
+    previous = _previous_vectors(output_path)
+
+    entries: List[dict] = []
+    row_entries: List[int] = []
+    row_texts: List[str] = []
+    row_vectors: List[Optional[List[float]]] = []
+
+    for item in items:
+        entry_idx = len(entries)
+        threshold = item.get("threshold")
+        entries.append(
+            {
+                "id": _entry_id(item),
+                "question": item["question"].strip(),
+                "answer": item["answer"].strip(),
+                "tags": item.get("tags") or [],
+                "category": item.get("category"),
+                "priority": item.get("priority"),
+                "threshold": float(default_threshold if threshold is None else threshold),
+            }
+        )
+        stored = item.get("embedding")
+        questions = [item["question"].strip()] + [str(p).strip() for p in item.get("paraphrases") or [] if str(p).strip()]
+        for position, question in enumerate(dict.fromkeys(questions)):
+            row_entries.append(entry_idx)
+            row_texts.append(question)
+            if position == 0 and isinstance(stored, list) and stored and item.get("embeddingModel", MODEL_NAME) == MODEL_NAME:
+                row_vectors.append(stored)
+            else:
+                row_vectors.append(previous.get(content_hash(question)))
+
+    pending = [idx for idx, vector in enumerate(row_vectors) if vector is None]
+    print(f"📚 {len(entries)} entradas, {len(row_texts)} perguntas; {len(pending)} precisam de embedding")
+
+    if pending and not dry_run:
+        provider = provider or create_provider()
+        step = batch_size * max(1, concurrency)
+        for offset in range(0, len(pending), step):
+            batch = pending[offset : offset + step]
+            vectors = provider.embed_many([row_texts[i] for i in batch], batch_size, concurrency)
+            for idx, vector in zip(batch, vectors):
+                row_vectors[idx] = vector
+            print(f"🧮 {offset + len(batch)}/{len(pending)} embeddings")
+
+    ready = [idx for idx, vector in enumerate(row_vectors) if vector is not None]
+    dim = len(row_vectors[ready[0]]) if ready else 0
+    matrix = np.asarray([row_vectors[idx] for idx in ready], dtype=np.float32).reshape(len(ready), dim)
+    if len(ready):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = matrix / norms
+
+    payload = {
+        "model": MODEL_NAME,
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "default_threshold": default_threshold,
+        "entries": entries,
+        "vectors": {
+            "dtype": "float16",
+            "dim": dim,
+            "rows": [row_entries[idx] for idx in ready],
+            "hashes": [content_hash(row_texts[idx]) for idx in ready],
+            "data": _encode(matrix),
+        },
+    }
+    output_path.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    print(f"✅ FAQ gravado em {output_path} ({len(ready)} vetores, {output_path.stat().st_size} bytes)")
+    return payload
+
+
+class FaqIndex:
+    def __init__(self, payload: dict) -> None:
+        self.entries: List[dict] = payload["entries"]
+        vectors = payload["vectors"]
+        self.rows = np.asarray(vectors["rows"], dtype=np.int64)
+        self.matrix = _decode(vectors["data"], len(self.rows), vectors["dim"]) if len(self.rows) else np.zeros((0, 0))
+        self.thresholds = np.asarray([entry["threshold"] for entry in self.entries], dtype=np.float32)
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_FAQ_OUTPUT) -> "FaqIndex":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def match(self, query_vector: Sequence[float]) -> Optional[dict]:
+        """Entrada cuja pergunta (ou paráfrase) passa do próprio limiar, ou None."""
+        if not len(self.rows):
+            return None
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0 or query.shape[-1] != self.matrix.shape[1]:
+            return None
+
+        scores = self.matrix @ (query / norm)
+        best_per_entry = np.full(len(self.entries), -np.inf, dtype=np.float32)
+        np.maximum.at(best_per_entry, self.rows, scores)
+        margin = best_per_entry - self.thresholds
+        winner = int(np.argmax(margin))
+        if margin[winner] < 0:
+            return None
+        return {**self.entries[winner], "similarity": float(best_per_entry[winner]), "source": "faq_cache"}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Gerar faq_index.json a partir de perguntas/respostas curadas")
+    parser.add_argument("--input", type=Path, action="append", required=True, help="JSON/JSONL com question/answer")
+    parser.add_argument("--output", type=Path, default=DEFAULT_FAQ_OUTPUT)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Limiar padrão por entrada")
+    parser.add_argument("--batch-size", type=int, default=64, help="Perguntas por chamada de embeddings")
+    parser.add_argument("--dry-run", action="store_true", help="Não chama a API")
+    add_embedding_arguments(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        build_faq_index(
+            args.input,
+            args.output,
+            args.threshold,
+            args.batch_size,
+            args.dry_run,
+            provider=None if args.dry_run else provider_from_args(args),
+            concurrency=args.embed_concurrency,
+        )
+    except (SystemExit, EmbeddingError) as exc:
+        print(str(exc))
+        sys.exit(1)
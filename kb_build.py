@@ -3,26 +3,69 @@
 Objetivos principais:
 - Evitar estouros de tempo/memória permitindo limitar quantos arquivos são processados.
 - Verificar se a variável OPENAI_API_KEY está presente antes de chamar a API.
+- Embeddings por um provedor plugável (OpenAI, HTTP com retentativas ou dry-run), em
+  lotes e com concorrência configurável (ver kb_embeddings.py).
 - Possibilitar dry-run (sem chamadas à API) para validar o pipeline rapidamente.
+- Incluir o digest de parâmetros de impressão (print-parameters-rag.json, ou o
+  print-parameters-rag-grouped.json com um chunk por resina) no mesmo índice,
+  reprocessando apenas os perfis novos ou alterados.
+- Opcionalmente gravar um bundle fragmentado por categoria (ver kb_bundle.py).
+- Persistir metadados por documento (arquivo, categoria, resinas citadas, tags) e um
+  índice invertido em bitmaps para pré-filtrar a busca vetorial (ver kb_search.py).
+- Registrar um identificador de geração ("generation") a cada gravação, usado pelos
+  caches de consulta para invalidação (ver kb_retrieval.py).
+- Guardar a contagem de tokens de cada documento (tiktoken, ou estimativa; ver kb_tokens.py), usada pelo
+  empacotador de contexto com orçamento de tokens (ver kb_context.py).
+- Opcionalmente gravar o texto num content store comprimido, com um índice enxuto
+  só de ids/vetores/metadados (ver kb_content_store.py).
+- Opcionalmente gravar o grafo kNN entre documentos, calculado em blocos (ver kb_knn.py).
+- Opcionalmente exportar JSONL pronto para bulk load no MongoDB (ver scripts/mongo_bulk_export.py).
+- Modo --watch: reindexação contínua e incremental com publicação atômica (ver kb_watch.py).
 """
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import os
 import sys
+import uuid
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 from typing import Dict, List, Optional
 
+from kb_bundle import write_bundle
+from kb_embeddings import (
+    DEFAULT_EMBED_URL,
+    DryRunProvider,
+    EmbeddingError,
+    EmbeddingProvider,
+    HttpEmbeddingProvider,
+    OpenAIProvider,
+)
+from kb_content_store import write_content_store
+from kb_metadata import (
+    DEFAULT_OUTPUT,
+    MODEL_NAME,
+    PARAMS_ID_PREFIX,
+    build_filter_index,
+    document_category,
+    document_metadata,
+)
+from kb_tokens import count_tokens, document_block_body, tokenizer_name
+from scripts.entity_extractor import EntityExtractor
+from scripts.mongo_bulk_export import DEFAULT_CHUNK_SIZE, kb_document_to_mongo, write_bulk_export
+
 try:
     from openai import OpenAI  # type: ignore
 except Exception:  # pragma: no cover - import guard
     OpenAI = None  # type: ignore
 
-MODEL_NAME = "text-embedding-3-large"
 DEFAULT_INPUT_DIR = Path("rag-knowledge")
-DEFAULT_OUTPUT = Path("kb_index.json")
+DEFAULT_PARAMS_DIGEST = Path("data/print-parameters-rag.json")
+DEFAULT_ENTITIES = Path("data/entity-automaton.json")
+MONGO_COLLECTION = "documents"
 
 
 def load_existing_index(output_path: Path) -> Dict[str, dict]:
@@ -38,13 +81,80 @@ def load_existing_index(output_path: Path) -> Dict[str, dict]:
         return {}
 
 
-def save_index(output_path: Path, documents: List[dict]) -> None:
+def load_entity_extractor(path: Optional[Path]) -> Optional[EntityExtractor]:
+    if path is None or not path.exists():
+        return None
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    return EntityExtractor.from_database(raw) if "profiles" in raw else EntityExtractor(raw)
+
+
+def annotate_documents(documents: List[dict], extractor: Optional[EntityExtractor]) -> int:
+    """Atualiza doc["metadata"]; devolve quantos documentos mudaram."""
+    changed = 0
+    for doc in documents:
+        metadata = document_metadata(doc, extractor)
+        if doc.get("metadata") != metadata:
+            doc["metadata"] = metadata
+            changed += 1
+    return changed
+
+
+def annotate_token_counts(documents: List[dict], recount: bool = False) -> int:
+    changed = 0
+    for doc in documents:
+        if recount or "token_count" not in doc:
+            doc["token_count"] = count_tokens(document_block_body(doc))
+            changed += 1
+    return changed
+
+
+def write_atomic(path: Path, text: str) -> None:
+    """Grava num temporário ao lado e troca com os.replace: leitores nunca veem arquivo pela metade."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def save_index(output_path: Path, documents: List[dict]) -> dict:
     payload = {
         "model": MODEL_NAME,
         "generated_at": datetime.utcnow().isoformat() + "Z",
+        "generation": uuid.uuid4().hex,
+        "tokenizer": tokenizer_name(),
         "documents": documents,
+        "filters": build_filter_index(documents),
     }
-    output_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2))
+    write_atomic(output_path, json.dumps(payload, ensure_ascii=False, indent=2))
+    return payload
+
+
+def existing_header(output_path: Path) -> dict:
+    try:
+        raw = json.loads(output_path.read_text())
+        return {
+            "generated_at": raw.get("generated_at") or "",
+            "generation": raw.get("generation") or "",
+            "tokenizer": raw.get("tokenizer") or "",
+        }
+    except (OSError, json.JSONDecodeError, AttributeError):
+        return {"generated_at": "", "generation": "", "tokenizer": ""}
+
+
+def save_lean_index(output_path: Path, documents: List[dict], header: dict, content_store: Path) -> Path:
+    """Versão do índice sem title/content; o texto fica no content store."""
+    lean_path = output_path.with_suffix(".lean.json")
+    payload = {
+        "model": MODEL_NAME,
+        "generated_at": header.get("generated_at"),
+        "generation": header.get("generation"),
+        "tokenizer": header.get("tokenizer"),
+        "content_store": os.path.relpath(content_store, lean_path.parent),
+        "knn_graph": os.path.relpath(header["knn_graph"], lean_path.parent) if header.get("knn_graph") else None,
+        "documents": [{key: value for key, value in doc.items() if key not in ("title", "content")} for doc in documents],
+        "filters": build_filter_index(documents),
+    }
+    write_atomic(lean_path, json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+    return lean_path
 
 
 def get_files(input_dir: Path, start: int, limit: Optional[int]) -> List[Path]:
@@ -55,6 +165,116 @@ def get_files(input_dir: Path, start: int, limit: Optional[int]) -> List[Path]:
     return sliced
 
 
+def create_client():
+    if OpenAI is None:
+        raise SystemExit(
+            "Biblioteca `openai` não instalada. Execute `pip install -r requirements.txt`\n"
+            "Use --dry-run para testar sem API."
+        )
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise SystemExit("OPENAI_API_KEY não configurada no ambiente.")
+    return OpenAI(api_key=api_key)
+
+
+def create_provider(
+    kind: str = "openai",
+    dry_run: bool = False,
+    base_url: str = DEFAULT_EMBED_URL,
+    max_retries: int = 5,
+    timeout: float = 60.0,
+) -> EmbeddingProvider:
+    if dry_run:
+        return DryRunProvider()
+    if kind == "http":
+        return HttpEmbeddingProvider(
+            base_url, MODEL_NAME, api_key=os.getenv("OPENAI_API_KEY"), timeout=timeout, max_retries=max_retries
+        )
+    return OpenAIProvider(create_client(), MODEL_NAME)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_params_digest(digest_path: Path) -> List[dict]:
+    raw = json.loads(digest_path.read_text(encoding="utf-8"))
+    chunks = raw.get("chunks", []) if isinstance(raw, dict) else raw
+    return [chunk for chunk in chunks if isinstance(chunk, dict) and chunk.get("id") and chunk.get("text")]
+
+
+def ingest_params_digest(
+    digest_path: Path,
+    existing: Dict[str, dict],
+    documents: List[dict],
+    provider: EmbeddingProvider,
+    embed_batch_size: int,
+    output_path: Path,
+    dry_run: bool,
+    checkpoint: bool = True,
+    concurrency: int = 1,
+) -> int:
+    """Embute somente os chunks do digest cujo texto mudou desde a última execução."""
+    chunks = load_params_digest(digest_path)
+    current_ids = {PARAMS_ID_PREFIX + chunk["id"] for chunk in chunks}
+
+    stale = [doc_id for doc_id in existing if doc_id.startswith(PARAMS_ID_PREFIX) and doc_id not in current_ids]
+    if stale:
+        documents[:] = [doc for doc in documents if doc.get("id") not in stale]
+        print(f"🧹 Removidos {len(stale)} perfis que não existem mais no digest")
+
+    pending: List[dict] = []
+    for chunk in chunks:
+        doc_id = PARAMS_ID_PREFIX + chunk["id"]
+        text = chunk["text"].strip()
+        digest = content_hash(text)
+        previous = existing.get(doc_id)
+        if previous and previous.get("content_hash") == digest and (previous.get("embedding") or dry_run):
+            continue
+        pending.append(
+            {
+                "id": doc_id,
+                "profile_id": chunk["id"],
+                "source": str(digest_path),
+                "title": "Parâmetros " + " | ".join(part for part in (chunk.get("resin"), chunk.get("printer")) if part),
+                "content": text,
+                "status": chunk.get("status"),
+                "category": "parametros",
+                "content_hash": digest,
+                "embedding_model": MODEL_NAME,
+                "embedding": [],
+            }
+        )
+
+    if not pending:
+        print(f"↪️  Digest de parâmetros sem alterações ({len(chunks)} perfis)")
+        return len(stale)
+
+    print(f"🧮 {len(pending)} de {len(chunks)} perfis do digest precisam de embedding")
+    positions = {doc.get("id"): pos for pos, doc in enumerate(documents)}
+
+    step = embed_batch_size * max(1, concurrency)
+    for offset in range(0, len(pending), step):
+        batch = pending[offset : offset + step]
+        if not dry_run:
+            vectors = provider.embed_many([doc["content"] for doc in batch], embed_batch_size, concurrency)
+            for doc, vector in zip(batch, vectors):
+                doc["embedding"] = vector
+
+        for doc in batch:
+            if doc["id"] in positions:
+                documents[positions[doc["id"]]] = doc
+            else:
+                positions[doc["id"]] = len(documents)
+                documents.append(doc)
+
+        if checkpoint:
+            save_index(output_path, documents)
+            print(f"💾 Lote do digest salvo ({offset + len(batch)}/{len(pending)})")
+
+    return len(pending) + len(stale)
+
+
 def build_index(
     input_dir: Path,
     output_path: Path,
@@ -63,77 +283,232 @@ def build_index(
     batch_size: int,
     max_chars: int,
     dry_run: bool,
-) -> None:
+    params_digest: Optional[Path] = None,
+    embed_batch_size: int = 64,
+    bundle_dir: Optional[Path] = None,
+    mongo_export: Optional[Path] = None,
+    mongo_chunk_size: int = DEFAULT_CHUNK_SIZE,
+    entities_path: Optional[Path] = DEFAULT_ENTITIES,
+    content_store: Optional[Path] = None,
+    refresh_changed: bool = False,
+    prune_missing: bool = False,
+    checkpoint: bool = True,
+    provider: Optional[EmbeddingProvider] = None,
+    embed_concurrency: int = 1,
+    knn: int = 0,
+    knn_block_rows: int = 1024,
+) -> int:
+    """Devolve quantos documentos foram adicionados, reembutidos ou removidos.
+
+    refresh_changed reembute .txt já indexados cujo texto mudou (pelo content_hash);
+    prune_missing remove documentos de .txt que saíram do input_dir; checkpoint=False
+    grava o índice uma única vez no fim (usado pelo modo --watch).
+    """
     if not input_dir.exists():
         raise SystemExit(f"Diretório de conhecimento não encontrado: {input_dir}")
 
     existing = load_existing_index(output_path)
+    # Lido antes de qualquer checkpoint: save_index já grava o tokenizer atual no cabeçalho.
+    previous_tokenizer = existing_header(output_path)["tokenizer"]
     documents: List[dict] = list(existing.values())
+    for doc in documents:
+        doc.setdefault("category", document_category(doc))
 
-    if not dry_run:
-        if OpenAI is None:
-            raise SystemExit(
-                "Biblioteca `openai` não instalada. Execute `pip install -r requirements.txt`\n"
-                "Use --dry-run para testar sem API."
-            )
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise SystemExit("OPENAI_API_KEY não configurada no ambiente.")
-        client = OpenAI(api_key=api_key)
-    else:
-        client = None
+    if provider is None:
+        provider = create_provider(dry_run=dry_run)
 
     files = get_files(input_dir, start, limit)
     if not files:
         print("Nenhum arquivo .txt encontrado para processar.")
-        return
 
-    processed = 0
     new_docs = 0
+    positions = {doc.get("id"): pos for pos, doc in enumerate(documents)}
 
-    for idx, file_path in enumerate(files, start=1):
-        file_id = file_path.name
-        if file_id in existing:
-            print(f"↪️  Pulando {file_id} (já presente no índice)")
-            continue
+    if prune_missing:
+        present = {path.name for path in get_files(input_dir, 0, None)}
+        # resolve(): o índice pode ter "source" relativo e o --input-dir ser absoluto (ou o contrário).
+        watched_dir = input_dir.resolve()
+        removed = [
+            doc.get("id")
+            for doc in documents
+            if not str(doc.get("id", "")).startswith(PARAMS_ID_PREFIX)
+            and Path(str(doc.get("source") or "")).resolve().parent == watched_dir
+            and doc.get("id") not in present
+        ]
+        if removed:
+            documents[:] = [doc for doc in documents if doc.get("id") not in removed]
+            positions = {doc.get("id"): pos for pos, doc in enumerate(documents)}
+            new_docs += len(removed)
+            print(f"🧹 Removidos {len(removed)} documentos cujos arquivos saíram de {input_dir}")
 
+    pending: List[dict] = []
+    embed_inputs: Dict[str, str] = {}
+    for file_path in files:
+        file_id = file_path.name
         text = file_path.read_text(encoding="utf-8", errors="ignore").strip()
+        digest = content_hash(text)
         title, _, body = text.partition("\n")
-        embed_input = text[:max_chars]
+        title, content = title or file_path.stem, body.strip() or text
 
-        embedding: List[float]
-        if dry_run:
-            embedding = []
-        else:
-            response = client.embeddings.create(model=MODEL_NAME, input=embed_input)
-            embedding = response.data[0].embedding
+        if file_id in existing:
+            previous = existing[file_id]
+            embedded = previous.get("embedding") or dry_run
+            if not refresh_changed or (previous.get("content_hash") == digest and embedded):
+                print(f"↪️  Pulando {file_id} (já presente no índice)")
+                continue
+            if (
+                previous.get("content_hash") is None
+                and embedded
+                and (previous.get("title"), previous.get("content")) == (title, content)
+                and file_id in positions
+            ):
+                # Índice anterior sem hash, mas com o mesmo texto: só adota o hash, sem reembutir.
+                documents[positions[file_id]]["content_hash"] = digest
+                new_docs += 1
+                continue
+            print(f"🔁 {file_id} mudou; reembutindo")
 
-        documents.append(
+        embed_inputs[file_id] = text[:max_chars]
+        pending.append(
             {
                 "id": file_id,
                 "source": str(file_path),
-                "title": title or file_path.stem,
-                "content": body.strip() or text,
+                "title": title,
+                "content": content,
+                "category": document_category({"source": str(file_path)}),
+                "content_hash": digest,
                 "embedding_model": MODEL_NAME,
-                "embedding": embedding,
+                "embedding": [],
             }
         )
 
-        new_docs += 1
-        processed += 1
+    # Os .txt pendentes vão em lotes (e, com --embed-concurrency, vários lotes em paralelo).
+    # Com checkpoint, cada grupo tem no máximo batch_size documentos: uma falha de
+    # embeddings perde no máximo isso, e o grupo é repartido entre as requisições paralelas.
+    step = embed_batch_size * max(1, embed_concurrency)
+    if checkpoint:
+        step = max(1, min(step, batch_size))
+    for offset in range(0, len(pending), step):
+        group = pending[offset : offset + step]
+        per_request = min(embed_batch_size, -(-len(group) // max(1, embed_concurrency)))
+        vectors = provider.embed_many([embed_inputs[doc["id"]] for doc in group], per_request, embed_concurrency)
+        for position, (doc, vector) in enumerate(zip(group, vectors), start=offset + 1):
+            doc["embedding"] = vector
+            if doc["id"] in positions:
+                documents[positions[doc["id"]]] = doc
+            else:
+                positions[doc["id"]] = len(documents)
+                documents.append(doc)
+            print(f"✅ Processado {doc['id']} ({position}/{len(pending)})")
 
-        if new_docs % batch_size == 0:
+        new_docs += len(group)
+        if checkpoint:
             save_index(output_path, documents)
-            print(f"💾 Progresso salvo após {new_docs} novos documentos (arquivo: {file_id})")
+            print(f"💾 Progresso salvo após {new_docs} novos documentos (arquivo: {group[-1]['id']})")
+
+    if params_digest is not None:
+        if params_digest.exists():
+            new_docs += ingest_params_digest(
+                params_digest,
+                existing,
+                documents,
+                provider,
+                embed_batch_size,
+                output_path,
+                dry_run,
+                checkpoint,
+                embed_concurrency,
+            )
+        else:
+            print(f"ℹ️  Digest de parâmetros não encontrado em {params_digest}; pulando.")
+
+    extractor = load_entity_extractor(entities_path)
+    if extractor is None:
+        print(f"ℹ️  Autômato de entidades não encontrado em {entities_path}; metadados sem resinas.")
+    annotated = annotate_documents(documents, extractor)
+    annotated += annotate_token_counts(documents, recount=previous_tokenizer != tokenizer_name())
+    if annotated:
+        print(f"🏷️  Metadados atualizados em {annotated} documentos")
 
-        print(f"✅ Processado {file_id} ({idx}/{len(files)})")
+    counters = provider.stats()
+    if counters.get("requests"):
+        print(
+            f"📡 Embeddings: {counters['texts']} textos em {counters['requests']} requisições "
+            f"({counters['retries']} retentativas, {counters['failures']} falhas)"
+        )
 
-    if new_docs:
-        save_index(output_path, documents)
+    if new_docs or annotated:
+        payload = save_index(output_path, documents)
         print(f"🎉 Index final salvo com {len(documents)} documentos no total.")
     else:
+        payload = existing_header(output_path)
         print("Nenhum novo documento adicionado. Índice permanece inalterado.")
 
+    if knn:
+        from kb_knn import load_knn_graph, write_knn_graph
+
+        knn_path = output_path.with_suffix(".knn.npz")
+        try:
+            graph = load_knn_graph(knn_path)
+            current = graph["generation"] == payload["generation"] and graph["requested_k"] == knn
+        except (OSError, KeyError, ValueError):
+            current = False
+        if current:
+            print(f"↪️  Grafo kNN em {knn_path} já corresponde a esta geração")
+        else:
+            graph = write_knn_graph(knn_path, documents, knn, payload["generation"], block_rows=knn_block_rows)
+            print(f"🕸️  Grafo kNN (k={graph['k']}) de {graph['documents']} documentos em {knn_path} ({graph['bytes']} bytes)")
+        payload = {**payload, "knn_graph": knn_path}
+
+    if bundle_dir is not None:
+        manifest = write_bundle(bundle_dir, documents, MODEL_NAME, payload["generated_at"])
+        summary = ", ".join(f"{shard['category']}={shard['documents']}" for shard in manifest["shards"])
+        print(f"📦 Bundle gravado em {bundle_dir} ({summary})")
+
+    if content_store is not None:
+        store = write_content_store(documents, content_store)
+        lean_path = save_lean_index(output_path, documents, payload, content_store)
+        print(
+            f"🗜️  Content store {content_store} ({store['codec']}, {store['blocks']} blocos, "
+            f"{store['raw_bytes']} → {store['stored_bytes']} bytes); índice sem texto em {lean_path}"
+        )
+
+    if mongo_export is not None:
+        export = write_bulk_export(
+            (kb_document_to_mongo(doc, MODEL_NAME) for doc in documents),
+            mongo_export,
+            collection=MONGO_COLLECTION,
+            upsert_key="legacyId",
+            chunk_size=mongo_chunk_size,
+        )
+        print(f"🗃️  Export MongoDB: {export['documents']} documentos em {len(export['files'])} arquivos ({mongo_export})")
+
+    return new_docs + annotated
+
+
+def add_embedding_arguments(parser: argparse.ArgumentParser) -> None:
+    """Opções do provedor de embeddings, compartilhadas com o faq_index.py."""
+    parser.add_argument(
+        "--embed-provider",
+        choices=("openai", "http"),
+        default="openai",
+        help="openai = cliente oficial; http = POST <--embed-url>/embeddings com retentativas (ex.: fake_embeddings_server.py)",
+    )
+    parser.add_argument("--embed-url", default=DEFAULT_EMBED_URL, help="Base URL do provedor http (termina em /v1)")
+    parser.add_argument("--embed-concurrency", type=int, default=1, help="Lotes de embeddings enviados em paralelo")
+    parser.add_argument("--embed-retries", type=int, default=5, help="Retentativas por lote no provedor http")
+    parser.add_argument("--embed-timeout", type=float, default=60.0, help="Timeout (s) por requisição no provedor http")
+
+
+def provider_from_args(args: argparse.Namespace) -> EmbeddingProvider:
+    return create_provider(
+        args.embed_provider,
+        dry_run=args.dry_run,
+        base_url=args.embed_url,
+        max_retries=args.embed_retries,
+        timeout=args.embed_timeout,
+    )
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Gerar kb_index.json em lotes menores")
@@ -141,16 +516,57 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Arquivo de saída (kb_index.json)")
     parser.add_argument("--start", type=int, default=0, help="Arquivo inicial (offset) para processar")
     parser.add_argument("--limit", type=int, help="Quantidade máxima de arquivos a processar")
-    parser.add_argument("--batch-size", type=int, default=5, help="Grava a cada N novos documentos")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=5,
+        help="Grava a cada N novos documentos (uma falha de embeddings perde no máximo N)",
+    )
     parser.add_argument("--max-chars", type=int, default=8000, help="Trunca o texto enviado para a API")
     parser.add_argument("--dry-run", action="store_true", help="Não chama a API; útil para testes rápidos")
+    parser.add_argument(
+        "--params-digest",
+        type=Path,
+        default=DEFAULT_PARAMS_DIGEST,
+        help="Digest de parâmetros gerado pelos importadores (print-parameters-rag.json)",
+    )
+    parser.add_argument("--skip-params-digest", action="store_true", help="Não inclui o digest de parâmetros no índice")
+    parser.add_argument("--embed-batch-size", type=int, default=64, help="Textos por chamada de embeddings")
+    add_embedding_arguments(parser)
+    parser.add_argument("--bundle-dir", type=Path, help="Também grava o índice fragmentado por categoria neste diretório")
+    parser.add_argument(
+        "--entities",
+        type=Path,
+        default=DEFAULT_ENTITIES,
+        help="entity-automaton.json (ou print-parameters-db.json) usado para detectar resinas citadas",
+    )
+    parser.add_argument(
+        "--content-store",
+        type=Path,
+        help="Grava o texto em blocos comprimidos (ex.: kb_content.bin) e um <output>.lean.json sem texto",
+    )
+    parser.add_argument("--mongo-export", type=Path, help="Grava JSONL (Extended JSON) pronto para bulk load no MongoDB")
+    parser.add_argument("--mongo-chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Documentos por arquivo JSONL")
+    parser.add_argument("--knn", type=int, default=0, help="Grava o grafo dos K vizinhos mais próximos (<output>.knn.npz)")
+    parser.add_argument("--knn-block-rows", type=int, default=1024, help="Linhas por bloco na multiplicação do kNN")
+    parser.add_argument("--watch", action="store_true", help="Fica observando as fontes e reindexa o que mudar")
+    parser.add_argument(
+        "--watch-params",
+        type=Path,
+        action="append",
+        default=[],
+        help="Planilha (.xlsx) ou HTML de parâmetros a reimportar quando mudar (pode repetir)",
+    )
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Segundos entre verificações no modo --watch")
+    parser.add_argument("--debounce", type=float, default=3.0, help="Segundos sem mudanças antes de reindexar")
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     args = parse_args()
     try:
-        build_index(
+        build = partial(
+            build_index,
             input_dir=args.input_dir,
             output_path=args.output,
             start=args.start,
@@ -158,7 +574,34 @@ if __name__ == "__main__":
             batch_size=args.batch_size,
             max_chars=args.max_chars,
             dry_run=args.dry_run,
+            params_digest=None if args.skip_params_digest else args.params_digest,
+            embed_batch_size=args.embed_batch_size,
+            bundle_dir=args.bundle_dir,
+            mongo_export=args.mongo_export,
+            mongo_chunk_size=args.mongo_chunk_size,
+            entities_path=args.entities,
+            content_store=args.content_store,
+            provider=provider_from_args(args),
+            embed_concurrency=args.embed_concurrency,
+            knn=args.knn,
+            knn_block_rows=args.knn_block_rows,
         )
-    except SystemExit as exc:  # Propagar mensagens amigáveis
+        if args.watch:
+            from kb_watch import watch
+
+            watch(
+                build,
+                input_dir=args.input_dir,
+                params_digest=None if args.skip_params_digest else args.params_digest,
+                entities_path=args.entities,
+                param_sources=args.watch_params,
+                poll=args.poll_interval,
+                debounce=args.debounce,
+            )
+        else:
+            build()
+    except KeyboardInterrupt:
+        print("👋 Encerrado.")
+    except (SystemExit, EmbeddingError) as exc:  # Propagar mensagens amigáveis
         print(str(exc))
         sys.exit(1)
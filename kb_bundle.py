@@ -0,0 +1,126 @@
+"""Bundle fragmentado do kb_index.json para inicialização rápida dos consumidores.
+
+O kb_build.py grava, além do kb_index.json, um diretório com:
+- manifest.json: pequeno, com checksum (sha256), tamanho e faixa de documentos de cada shard;
+- um shard por categoria de fonte (shard-<categoria>-<hash>.json).
+
+Consumidores leem apenas o manifesto e abrem somente os shards de que precisam,
+verificando tamanho e checksum antes de usar. Cada gravação mantém os shards do
+manifesto anterior, para quem ainda o tem em memória; os mais antigos são removidos.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+BUNDLE_FORMAT = "kb-bundle"
+BUNDLE_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+
+class BundleIntegrityError(RuntimeError):
+    pass
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def _manifest_files(bundle_dir: Path) -> set:
+    try:
+        return {shard["file"] for shard in load_manifest(bundle_dir)["shards"]}
+    except (OSError, ValueError, KeyError, TypeError, BundleIntegrityError):
+        return set()
+
+
+def write_bundle(bundle_dir: Path, documents: List[dict], model: str, generated_at: str, **extra) -> dict:
+    bundle_dir.mkdir(parents=True, exist_ok=True)
+    previous = _manifest_files(bundle_dir)
+
+    groups: Dict[str, List[dict]] = {}
+    for doc in documents:
+        groups.setdefault(doc.get("category") or "geral", []).append(doc)
+
+    shards = []
+    position = 0
+    for category in sorted(groups):
+        docs = groups[category]
+        data = json.dumps(
+            {"category": category, "offset": position, "documents": docs},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        file_name = f"shard-{category}-{digest[:12]}.json"
+        shard_path = bundle_dir / file_name
+        if not shard_path.exists():
+            _write_atomic(shard_path, data)
+        shards.append(
+            {
+                "category": category,
+                "file": file_name,
+                "sha256": digest,
+                "bytes": len(data),
+                "documents": len(docs),
+                "range": [position, position + len(docs)],
+            }
+        )
+        position += len(docs)
+
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "version": BUNDLE_VERSION,
+        "model": model,
+        "generated_at": generated_at,
+        **extra,
+        "total_documents": position,
+        "shards": shards,
+    }
+    _write_atomic(bundle_dir / MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    # Leitores preguiçosos ainda com o manifesto anterior abrem shards depois:
+    # os da geração anterior ficam, só somem os que nenhum dos dois manifestos cita.
+    referenced = {shard["file"] for shard in shards} | previous
+    for old_shard in bundle_dir.glob("shard-*.json"):
+        if old_shard.name not in referenced:
+            old_shard.unlink()
+
+    return manifest
+
+
+def load_manifest(bundle_dir: Path) -> dict:
+    manifest = json.loads((Path(bundle_dir) / MANIFEST_NAME).read_text(encoding="utf-8"))
+    if manifest.get("format") != BUNDLE_FORMAT or manifest.get("version") != BUNDLE_VERSION:
+        raise BundleIntegrityError(f"Manifesto incompatível em {bundle_dir}")
+    return manifest
+
+
+def read_shard(bundle_dir: Path, shard: dict, verify: bool = True) -> dict:
+    data = (Path(bundle_dir) / shard["file"]).read_bytes()
+    if verify:
+        if len(data) != shard["bytes"]:
+            raise BundleIntegrityError(f"Tamanho inesperado no shard {shard['file']}")
+        if hashlib.sha256(data).hexdigest() != shard["sha256"]:
+            raise BundleIntegrityError(f"Checksum inválido no shard {shard['file']}")
+    return json.loads(data)
+
+
+def iter_documents(
+    bundle_dir: Path,
+    categories: Optional[Iterable[str]] = None,
+    verify: bool = True,
+    manifest: Optional[dict] = None,
+) -> Iterator[dict]:
+    """Percorre os documentos apenas dos shards pedidos (todos, se categories=None)."""
+    manifest = manifest or load_manifest(bundle_dir)
+    wanted = set(categories) if categories is not None else None
+    for shard in manifest["shards"]:
+        if wanted is not None and shard["category"] not in wanted:
+            continue
+        yield from read_shard(bundle_dir, shard, verify=verify)["documents"]
+
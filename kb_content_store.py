@@ -0,0 +1,162 @@
+"""Armazenamento comprimido do texto dos documentos, com acesso por deslocamento.
+
+Os textos (title/content) são agrupados em blocos de ~64 KB comprimidos com zstd
+(se o pacote `zstandard` estiver instalado) ou zlib. Uma tabela no fim do arquivo
+aponta, para cada id, o bloco e a faixa do passage dentro dele. A busca trabalha
+só com ids e vetores; o texto é descomprimido sob demanda para os poucos hits,
+com cache LRU dos blocos já abertos.
+
+Layout do arquivo:
+    MAGIC | bloco 0 | bloco 1 | ... | tabela JSON | offset da tabela (uint64 LE) | MAGIC
+"""
+from __future__ import annotations
+
+import json
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import zstandard  # type: ignore
+except Exception:  # pragma: no cover - import guard
+    zstandard = None  # type: ignore
+
+MAGIC = b"QKBCS1\n"
+TRAILER = struct.Struct("<Q")
+DEFAULT_BLOCK_SIZE = 64 * 1024
+
+
+def _compressor(codec: str):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress
+    return lambda data: zlib.compress(data, 9)
+
+
+def _decompressor(codec: str):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Arquivo comprimido com zstd; instale o pacote `zstandard`.")
+        return zstandard.ZstdDecompressor().decompress
+    return zlib.decompress
+
+
+def write_content_store(
+    documents: Iterable[dict],
+    path: Path,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    codec: Optional[str] = None,
+) -> dict:
+    codec = codec or ("zstd" if zstandard is not None else "zlib")
+    compress = _compressor(codec)
+    table: Dict[str, object] = {"codec": codec, "blocks": [], "docs": {}}
+    raw_total = 0
+
+    tmp_path = Path(path).with_name(Path(path).name + ".tmp")
+    with open(tmp_path, "wb") as handle:
+        handle.write(MAGIC)
+        pending: List[bytes] = []
+        pending_size = 0
+
+        def flush() -> None:
+            nonlocal pending, pending_size
+            if not pending:
+                return
+            raw = b"".join(pending)
+            data = compress(raw)
+            table["blocks"].append([handle.tell(), len(data), len(raw)])
+            handle.write(data)
+            pending, pending_size = [], 0
+
+        for doc in documents:
+            passage = json.dumps(
+                {"title": doc.get("title"), "content": doc.get("content")}, ensure_ascii=False
+            ).encode("utf-8")
+            table["docs"][doc["id"]] = [len(table["blocks"]), pending_size, len(passage)]
+            pending.append(passage)
+            pending_size += len(passage)
+            raw_total += len(passage)
+            if pending_size >= block_size:
+                flush()
+        flush()
+
+        table_offset = handle.tell()
+        handle.write(json.dumps(table, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        handle.write(TRAILER.pack(table_offset))
+        handle.write(MAGIC)
+
+    tmp_path.replace(path)
+    return {
+        "codec": codec,
+        "documents": len(table["docs"]),
+        "blocks": len(table["blocks"]),
+        "raw_bytes": raw_total,
+        "stored_bytes": Path(path).stat().st_size,
+    }
+
+
+class ContentStore:
+    def __init__(self, path: Path, cached_blocks: int = 16) -> None:
+        self.path = Path(path)
+        self._handle = open(self.path, "rb")
+        self._handle.seek(-(TRAILER.size + len(MAGIC)), 2)
+        trailer = self._handle.read(TRAILER.size + len(MAGIC))
+        if trailer[TRAILER.size :] != MAGIC:
+            raise ValueError(f"{self.path} não é um content store válido")
+        (table_offset,) = TRAILER.unpack(trailer[: TRAILER.size])
+        end = self._handle.seek(0, 2) - TRAILER.size - len(MAGIC)
+        self._handle.seek(table_offset)
+        table = json.loads(self._handle.read(end - table_offset))
+
+        self.codec = table["codec"]
+        self._decompress = _decompressor(self.codec)
+        self.blocks = table["blocks"]
+        self.docs = table["docs"]
+        self._cache: "OrderedDict[int, bytes]" = OrderedDict()
+        self._cached_blocks = cached_blocks
+        self._lock = threading.Lock()
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.docs
+
+    def close(self) -> None:
+        with self._lock:
+            self._handle.close()
+
+    def __enter__(self) -> "ContentStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _block(self, index: int) -> bytes:
+        with self._lock:
+            data = self._cache.get(index)
+            if data is not None:
+                self._cache.move_to_end(index)
+                return data
+            offset, length, _ = self.blocks[index]
+            self._handle.seek(offset)
+            data = self._decompress(self._handle.read(length))
+            self._cache[index] = data
+            if len(self._cache) > self._cached_blocks:
+                self._cache.popitem(last=False)
+            return data
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        location = self.docs.get(doc_id)
+        if location is None:
+            return None
+        block, start, length = location
+        return json.loads(self._block(block)[start : start + length])
+
+    def hydrate(self, results: List[dict]) -> List[dict]:
+        """Preenche title/content de resultados que só trazem o id."""
+        for result in results:
+            if result.get("content") is None:
+                passage = self.get(result["id"]) or {}
+                result["title"] = result.get("title") or passage.get("title")
+                result["content"] = passage.get("content")
+        return results
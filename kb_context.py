@@ -0,0 +1,141 @@
+"""Montagem de contexto com orçamento exato de tokens.
+
+O formatContext do rag-search.js concatena tudo o que a busca devolveu, o que
+pode estourar o prompt. Aqui os candidatos são escolhidos por MMR (relevância
+menos redundância com o que já entrou), vetorizado sobre os embeddings já
+normalizados do KnowledgeSearch, e só entram blocos que ainda cabem no
+orçamento. O custo de cada bloco vem do token_count gravado pelo kb_build.py;
+em tempo de consulta só se tokenizam os cabeçalhos curtos ("**Documento N:**").
+O texto final tem exatamente o formato do formatContext.
+
+Uso:
+    packer = ContextPacker(KnowledgeSearch.load(Path("kb_index.json")), token_budget=1500)
+    packed = packer.pack(query_vector, filters={"category": "parametros"})
+    packed["context"], packed["tokens"]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from kb_metadata import DEFAULT_OUTPUT
+from kb_search import FilterValue, KnowledgeSearch
+from kb_tokens import count_tokens, document_block_body, tokenizer_name
+
+CONTEXT_HEADER = "### Conhecimento Relevante\n"
+EMPTY_CONTEXT = "Nenhum conhecimento relevante encontrado."
+DEFAULT_DIVERSITY = 0.3
+
+
+@lru_cache(maxsize=256)
+def _prefix_tokens(position: int) -> int:
+    return count_tokens(f"**Documento {position}:**")
+
+
+def format_context(documents: List[dict]) -> str:
+    """Mesmo texto do formatContext do rag-search.js."""
+    parts = [CONTEXT_HEADER]
+    for number, doc in enumerate(documents, start=1):
+        parts.append(f"**Documento {number}:**{document_block_body(doc)}")
+    return "".join(parts)
+
+
+class ContextPacker:
+    def __init__(
+        self,
+        engine: KnowledgeSearch,
+        token_budget: int,
+        diversity: float = DEFAULT_DIVERSITY,
+        candidates: int = 50,
+    ) -> None:
+        self.engine = engine
+        self.token_budget = token_budget
+        self.diversity = diversity
+        self.candidates = candidates
+        # Contagens gravadas com outro tokenizer não servem para orçamento exato.
+        self._stored_counts = engine.info.get("tokenizer") == tokenizer_name()
+
+    def _block_tokens(self, position: int) -> int:
+        doc = self.engine.documents[position]
+        if self._stored_counts and "token_count" in doc:
+            return int(doc["token_count"])
+        if doc.get("content") is None and self.engine.content_store is not None:
+            doc = {**doc, **(self.engine.content_store.get(doc.get("id")) or {})}
+        return count_tokens(document_block_body(doc))
+
+    def pack(
+        self,
+        query_vector: Sequence[float],
+        token_budget: Optional[int] = None,
+        filters: Optional[Dict[str, FilterValue]] = None,
+        min_score: Optional[float] = None,
+    ) -> dict:
+        budget = self.token_budget if token_budget is None else token_budget
+        rows = np.flatnonzero(self.engine.candidates(filters))
+        query = self.engine.normalize_query(query_vector)
+        relevance = self.engine.matrix[rows] @ query
+        if min_score is not None:
+            keep = relevance >= min_score
+            rows, relevance = rows[keep], relevance[keep]
+
+        if rows.size > self.candidates:
+            top = np.argpartition(-relevance, self.candidates - 1)[: self.candidates]
+            rows, relevance = rows[top], relevance[top]
+
+        header_tokens = count_tokens(CONTEXT_HEADER)
+        remaining = budget - header_tokens
+        costs = np.array([self._block_tokens(int(row)) for row in rows], dtype=np.int64)
+        vectors = self.engine.matrix[rows]
+        similarity = vectors @ vectors.T
+        max_similarity = np.zeros(rows.size, dtype=np.float32)
+        available = np.ones(rows.size, dtype=bool)
+        weight = 1.0 - self.diversity
+
+        chosen: List[int] = []
+        while available.any():
+            cost = costs + _prefix_tokens(len(chosen) + 1)
+            available &= cost <= remaining
+            if not available.any():
+                break
+            mmr = np.where(available, weight * relevance - self.diversity * max_similarity, -np.inf)
+            pick = int(np.argmax(mmr))
+            chosen.append(pick)
+            remaining -= int(cost[pick])
+            available[pick] = False
+            max_similarity = np.maximum(max_similarity, similarity[pick])
+
+        documents = [self.engine.result(int(rows[idx]), float(relevance[idx])) for idx in chosen]
+        # Com BPE a contagem do texto final pode diferir da soma das partes (fusões na
+        # emenda dos blocos): o total é contado de novo e, se passar, sai o último bloco.
+        while documents:
+            context = format_context(documents)
+            tokens = count_tokens(context)
+            if tokens <= budget:
+                return {"context": context, "documents": documents, "tokens": tokens, "budget": budget}
+            documents.pop()
+        return {"context": EMPTY_CONTEXT, "documents": [], "tokens": count_tokens(EMPTY_CONTEXT), "budget": budget}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Montar contexto com orçamento de tokens (MMR)")
+    parser.add_argument("--index", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--budget", type=int, default=1500, help="Orçamento de tokens do contexto")
+    parser.add_argument("--diversity", type=float, default=DEFAULT_DIVERSITY, help="0 = só relevância; 1 = só diversidade")
+    parser.add_argument("--like", required=True, help="Usa o embedding deste documento (id) como consulta")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    engine = KnowledgeSearch.load(args.index)
+    positions = {doc.get("id"): pos for pos, doc in enumerate(engine.documents)}
+    if args.like not in positions or not engine.has_vector[positions[args.like]]:
+        raise SystemExit(f"Documento sem embedding no índice: {args.like}")
+    packed = ContextPacker(engine, args.budget, diversity=args.diversity).pack(engine.matrix[positions[args.like]])
+    print(packed["context"])
+    print(json.dumps({"tokens": packed["tokens"], "budget": packed["budget"], "ids": [doc["id"] for doc in packed["documents"]]}))
@@ -0,0 +1,152 @@
+"""Provedores de embeddings plugáveis para o kb_build.py.
+
+O build não conversa mais direto com OpenAI(api_key=...): recebe um
+EmbeddingProvider com embed(texts). Há três implementações:
+
+- OpenAIProvider: o cliente oficial (padrão, como antes);
+- HttpEmbeddingProvider: POST <base_url>/embeddings via urllib, no formato da API
+  da OpenAI, com retentativas e backoff exponencial para 429/5xx/erros de rede
+  (respeita Retry-After). Serve tanto para a API real quanto para o servidor
+  local scripts/fake_embeddings_server.py;
+- DryRunProvider: vetores vazios, como o --dry-run sempre fez.
+
+embed_many() divide os textos em lotes e pode mandar vários lotes em paralelo
+(threads), preservando a ordem. Assim dá para medir lote, concorrência e
+retentativas sem rede:
+
+    python scripts/fake_embeddings_server.py --latency-ms 80 --error-rate 0.05 --rpm 600 &
+    python kb_build.py --embed-provider http --embed-url http://127.0.0.1:8089/v1 --embed-concurrency 8
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+DEFAULT_EMBED_URL = os.getenv("EMBEDDINGS_BASE_URL", "http://127.0.0.1:8089/v1")
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class EmbeddingError(RuntimeError):
+    pass
+
+
+class EmbeddingProvider(ABC):
+    """Interface: embed(texts) devolve um vetor por texto, na mesma ordem."""
+
+    model: str = ""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {"requests": 0, "texts": 0, "retries": 0, "failures": 0}
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Um vetor por texto; falhas definitivas sobem como EmbeddingError."""
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for name, value in deltas.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def embed_many(self, texts: List[str], batch_size: int = 64, concurrency: int = 1) -> List[List[float]]:
+        batches = [texts[offset : offset + batch_size] for offset in range(0, len(texts), batch_size)]
+        if concurrency <= 1 or len(batches) <= 1:
+            return [vector for batch in batches for vector in self.embed(batch)]
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as pool:
+            results = list(pool.map(self.embed, batches))
+        return [vector for batch in results for vector in batch]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
+
+
+class DryRunProvider(EmbeddingProvider):
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        self._count(texts=len(texts))
+        return [[] for _ in texts]
+
+
+class OpenAIProvider(EmbeddingProvider):
+    def __init__(self, client, model: str) -> None:
+        super().__init__()
+        self.client = client
+        self.model = model
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        self._count(requests=1, texts=len(texts))
+        response = self.client.embeddings.create(model=self.model, input=texts)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+class HttpEmbeddingProvider(EmbeddingProvider):
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        api_key: Optional[str] = None,
+        timeout: float = 60.0,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 20.0,
+    ) -> None:
+        super().__init__()
+        self.url = base_url.rstrip("/") + "/embeddings"
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def _delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        # Backoff exponencial com jitter completo; Retry-After, quando vem, é o piso.
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+        try:
+            floor = float(retry_after) if retry_after else 0.0
+        except ValueError:
+            floor = 0.0
+        return min(self.max_backoff, max(delay, floor))
+
+    def _post(self, texts: List[str]) -> dict:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        body = json.dumps({"model": self.model, "input": texts}).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers=headers, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        self._count(texts=len(texts))
+        attempt = 0
+        while True:
+            self._count(requests=1)
+            try:
+                payload = self._post(texts)
+            except urllib.error.HTTPError as exc:
+                if exc.code not in RETRY_STATUS:
+                    self._count(failures=1)
+                    raise EmbeddingError(f"HTTP {exc.code} em {self.url}: {exc.read()[:200]!r}") from exc
+                if attempt >= self.max_retries:
+                    self._count(failures=1)
+                    raise EmbeddingError(f"Desistindo após {attempt + 1} tentativas em {self.url}: HTTP {exc.code}") from exc
+                retry_after = exc.headers.get("Retry-After")
+            except (urllib.error.URLError, TimeoutError, ConnectionError) as exc:
+                if attempt >= self.max_retries:
+                    self._count(failures=1)
+                    raise EmbeddingError(f"Desistindo após {attempt + 1} tentativas em {self.url}: {exc}") from exc
+                retry_after = None
+            else:
+                return [item["embedding"] for item in sorted(payload["data"], key=lambda item: item["index"])]
+            self._count(retries=1)
+            time.sleep(self._delay(attempt, retry_after))
+            attempt += 1
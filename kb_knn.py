@@ -0,0 +1,85 @@
+"""Grafo de vizinhos mais próximos (kNN) entre os documentos do índice.
+
+Calculado uma vez no build (kb_build.py --knn K): a matriz de embeddings
+normalizada é multiplicada por ela mesma em blocos de linhas, então a memória
+fica limitada a bloco x N em vez de N x N. O resultado é uma adjacência compacta
+num .npz: neighbors (N x K, int32, posições em documents, -1 quando não há
+vizinho) e scores (N x K, float16), junto com o "generation" do índice para
+detectar grafo desatualizado. "Mais como este" e expansão de contexto viram uma
+leitura de linha (ver KnowledgeSearch.related).
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+DEFAULT_BLOCK_ROWS = 1024
+
+
+def embedding_matrix(documents: List[dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """Matriz float32 com linhas normalizadas e máscara de quem tem embedding completo."""
+    # Aceita listas (JSON) ou linhas numpy; "or []" falharia com arrays.
+    dims = [0 if doc.get("embedding") is None else len(doc["embedding"]) for doc in documents]
+    dimensions = max(dims, default=0)
+    has_vector = np.array([dim == dimensions and dim > 0 for dim in dims], dtype=bool)
+
+    matrix = np.zeros((len(documents), dimensions), dtype=np.float32)
+    for position in np.flatnonzero(has_vector):
+        matrix[position] = documents[position]["embedding"]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms, has_vector
+
+
+def build_knn_graph(
+    matrix: np.ndarray, has_vector: np.ndarray, k: int, block_rows: int = DEFAULT_BLOCK_ROWS
+) -> Tuple[np.ndarray, np.ndarray]:
+    rows = matrix.shape[0]
+    k = max(0, min(k, int(has_vector.sum()) - 1))
+    neighbors = np.full((rows, k), -1, dtype=np.int32)
+    scores = np.zeros((rows, k), dtype=np.float16)
+    if k == 0:
+        return neighbors, scores
+
+    columns = np.arange(rows)
+    for start in range(0, rows, block_rows):
+        end = min(start + block_rows, rows)
+        block = matrix[start:end] @ matrix.T
+        block[:, ~has_vector] = -np.inf
+        block[np.arange(end - start), columns[start:end]] = -np.inf  # sem laço para si mesmo
+
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        valid = has_vector[start:end]
+        neighbors[start:end][valid] = top[valid]
+        scores[start:end][valid] = top_scores[valid]
+    return neighbors, scores
+
+
+def write_knn_graph(
+    path: Path, documents: List[dict], k: int, generation: str, block_rows: int = DEFAULT_BLOCK_ROWS
+) -> dict:
+    matrix, has_vector = embedding_matrix(documents)
+    neighbors, scores = build_knn_graph(matrix, has_vector, k, block_rows)
+    tmp_path = Path(path).with_name(Path(path).name + ".tmp.npz")
+    np.savez_compressed(
+        tmp_path, neighbors=neighbors, scores=scores, generation=np.array(generation), requested_k=np.array(k)
+    )
+    tmp_path.replace(path)
+    return {"documents": len(documents), "k": neighbors.shape[1], "bytes": Path(path).stat().st_size}
+
+
+def load_knn_graph(path: Path) -> dict:
+    with np.load(path) as data:
+        return {
+            "neighbors": data["neighbors"],
+            "scores": data["scores"].astype(np.float32),
+            "generation": str(data["generation"]),
+            "requested_k": int(data["requested_k"]),
+        }
@@ -0,0 +1,85 @@
+"""Metadados dos documentos e índice invertido em bitmaps do kb_index.json.
+
+Compartilhado pelo lado que grava o índice (kb_build.py) e pelo que consulta
+(kb_search.py e quem o usa: kb_service, kb_parallel, kb_retrieval), para que a
+busca não precise importar o script de build e suas dependências (openai,
+provedores de embeddings).
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from scripts.entity_extractor import EntityExtractor, select_longest
+from scripts.mongo_bulk_export import build_tags
+
+MODEL_NAME = "text-embedding-3-large"
+DEFAULT_OUTPUT = Path("kb_index.json")
+PARAMS_ID_PREFIX = "params::"
+FILTER_FIELDS = ("source_file", "category", "resins", "tags")
+
+# Categoria de fonte derivada do nome do arquivo (primeira regra que casar).
+CATEGORY_RULES = [
+    ("troubleshooting", ("troubleshooting", "erros", "defeitos", "rachando", "adesao", "problema")),
+    ("parametros", ("parametros", "parameters")),
+    ("resinas", ("resina", "resins")),
+    ("empresa", ("empresa", "equipe")),
+]
+DEFAULT_CATEGORY = "geral"
+
+
+def document_category(doc: dict) -> str:
+    if str(doc.get("id", "")).startswith(PARAMS_ID_PREFIX):
+        return "parametros"
+    name = Path(str(doc.get("source") or doc.get("id") or "")).stem.lower()
+    for category, keywords in CATEGORY_RULES:
+        if any(keyword in name for keyword in keywords):
+            return category
+    return DEFAULT_CATEGORY
+
+
+def document_metadata(doc: dict, extractor: Optional[EntityExtractor]) -> dict:
+    resins: List[str] = []
+    if extractor is not None:
+        hits = extractor.extract(f"{doc.get('title', '')}\n{doc.get('content', '')}")
+        resins = sorted({hit["id"] for hit in select_longest(hits) if hit["type"] == "resin"})
+    return {
+        "source_file": Path(str(doc.get("source") or doc.get("id") or "")).name,
+        "category": doc.get("category") or document_category(doc),
+        "resins": resins,
+        "tags": build_tags(doc),
+    }
+
+
+def encode_bitmap(positions: List[int]) -> str:
+    value = 0
+    for position in positions:
+        value |= 1 << position
+    return format(value, "x")
+
+
+def decode_bitmap(encoded: str, size: int) -> np.ndarray:
+    value = int(encoded or "0", 16)
+    raw = value.to_bytes((size + 7) // 8 or 1, "little")
+    return np.unpackbits(np.frombuffer(raw, dtype=np.uint8), bitorder="little")[:size].astype(bool)
+
+
+def build_filter_index(documents: List[dict]) -> Dict[str, Dict[str, str]]:
+    """Índice invertido campo -> valor -> bitmap (hex, bit i = posição i em documents)."""
+    postings: Dict[str, Dict[str, List[int]]] = {field: {} for field in FILTER_FIELDS}
+    for position, doc in enumerate(documents):
+        metadata = doc.get("metadata") or {}
+        for field in FILTER_FIELDS:
+            values = metadata.get(field)
+            if values is None:
+                continue
+            if isinstance(values, str):
+                values = [values]
+            for value in values:
+                postings[field].setdefault(str(value).lower(), []).append(position)
+    return {
+        field: {value: encode_bitmap(positions) for value, positions in sorted(values.items())}
+        for field, values in postings.items()
+    }
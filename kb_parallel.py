@@ -0,0 +1,211 @@
+"""Busca top-k multi-core sobre a matriz de embeddings em arquivo memory-mapped.
+
+A matriz normalizada construída a partir do kb_index.json é gravada uma única vez
+num .npy e aberta por cada processo do pool com mmap_mode="r": as páginas ficam
+no cache do sistema operacional e são compartilhadas, sem cópia privada por
+worker. Cada worker pontua sua faixa contígua de linhas e devolve um top-k
+parcial; o processo principal junta os parciais no top-k final.
+
+Uso (benchmark):
+    python kb_parallel.py --synthetic-docs 200000 --synthetic-dim 768 --workers 1,2,4
+    python kb_parallel.py --index kb_index.json --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from kb_metadata import DEFAULT_OUTPUT
+from kb_search import FilterValue, KnowledgeSearch
+
+BLAS_THREAD_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+_worker_matrix: Optional[np.ndarray] = None
+
+
+def write_matrix(matrix: np.ndarray, path: Path) -> Path:
+    out = np.lib.format.open_memmap(str(path), mode="w+", dtype=np.float32, shape=matrix.shape)
+    out[:] = matrix
+    out.flush()
+    del out
+    return path
+
+
+def _init_worker(matrix_path: str) -> None:
+    global _worker_matrix
+    _worker_matrix = np.load(matrix_path, mmap_mode="r")
+
+
+def _score_shard(
+    queries: np.ndarray, start: int, end: int, top_k: int, masks: Optional[np.ndarray]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k parcial da faixa [start, end); masks tem uma linha de candidatos por consulta."""
+    scores = queries @ _worker_matrix[start:end].T
+    if masks is not None:
+        scores[~masks] = -np.inf
+    k = min(top_k, end - start)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return part + start, np.take_along_axis(scores, part, axis=1)
+
+
+class ParallelSearch:
+    """Top-k em paralelo; use como context manager para encerrar o pool."""
+
+    def __init__(
+        self,
+        engine: KnowledgeSearch,
+        workers: Optional[int] = None,
+        matrix_path: Optional[Path] = None,
+    ) -> None:
+        self.engine = engine
+        self.workers = workers or os.cpu_count() or 1
+        self._tmpdir = None
+        if matrix_path is None:
+            self._tmpdir = tempfile.TemporaryDirectory(prefix="kb_matrix_")
+            matrix_path = Path(self._tmpdir.name) / "matrix.npy"
+        self.matrix_path = write_matrix(engine.matrix, Path(matrix_path))
+
+        rows = len(engine.documents)
+        step = -(-rows // self.workers) if rows else 1
+        self.shards = [(start, min(start + step, rows)) for start in range(0, rows, step)]
+
+        # Um thread de BLAS por processo: o paralelismo vem dos shards.
+        previous = {name: os.environ.get(name) for name in BLAS_THREAD_VARS}
+        os.environ.update({name: "1" for name in BLAS_THREAD_VARS})
+        try:
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(str(self.matrix_path),),
+            )
+        finally:
+            for name, value in previous.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+    def __enter__(self) -> "ParallelSearch":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.pool.shutdown()
+        if self._tmpdir is not None:
+            self._tmpdir.cleanup()
+            self._tmpdir = None
+
+    def search_batch(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        top_k: Union[int, Sequence[int]] = 5,
+        filters: Optional[Sequence[Optional[Dict[str, FilterValue]]]] = None,
+        min_score: Optional[float] = None,
+    ) -> List[List[dict]]:
+        """Mesma assinatura e resultado de KnowledgeSearch.search_batch, com os shards em paralelo."""
+        queries = np.vstack([self.engine.normalize_query(vector) for vector in query_vectors]).astype(np.float32)
+        top_ks = [top_k] * len(queries) if isinstance(top_k, int) else list(top_k)
+        if any(k < 1 for k in top_ks):
+            raise ValueError(f"top_k deve ser >= 1 (recebido {min(top_ks)})")
+        if not self.shards:
+            return [[] for _ in queries]
+
+        masks = np.vstack([self.engine.candidates(item) for item in (filters or [None] * len(queries))])
+        widest = max(top_ks)
+        futures = [
+            self.pool.submit(_score_shard, queries, start, end, widest, masks[:, start:end])
+            for start, end in self.shards
+        ]
+        partial = [future.result() for future in futures]
+        rows = np.hstack([item[0] for item in partial])
+        scores = np.hstack([item[1] for item in partial])
+
+        k = min(widest, scores.shape[1])
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        best = np.take_along_axis(best, order, axis=1)
+
+        results = []
+        for query_idx, query_k in enumerate(top_ks):
+            hits = []
+            for col in best[query_idx][:query_k]:
+                score = float(scores[query_idx, col])
+                if score == -np.inf or (min_score is not None and score < min_score):
+                    break
+                hits.append(self.engine.result(int(rows[query_idx, col]), score))
+            results.append(hits)
+        return results
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        top_k: int = 5,
+        filters: Optional[Dict[str, FilterValue]] = None,
+        min_score: Optional[float] = None,
+    ) -> List[dict]:
+        return self.search_batch([query_vector], top_k, [filters], min_score)[0]
+
+
+def _benchmark(engine: KnowledgeSearch, workers: List[int], queries: int, batch: int, top_k: int) -> dict:
+    rng = np.random.default_rng(11)
+    vectors = rng.standard_normal((queries, engine.dimensions)).astype(np.float32)
+    report: dict = {"documents": len(engine.documents), "dimensions": engine.dimensions, "queries": queries}
+
+    started = time.perf_counter()
+    reference = [engine.search_batch(vectors[i : i + batch], top_k) for i in range(0, queries, batch)]
+    single = time.perf_counter() - started
+    report["single_process_qps"] = round(queries / single, 1)
+
+    for count in workers:
+        with ParallelSearch(engine, workers=count) as parallel:
+            parallel.search_batch(vectors[:1], top_k)  # aquece o pool
+            started = time.perf_counter()
+            got = [parallel.search_batch(vectors[i : i + batch], top_k) for i in range(0, queries, batch)]
+            elapsed = time.perf_counter() - started
+        same = all(
+            [hit["id"] for hit in a] == [hit["id"] for hit in b]
+            for chunk_a, chunk_b in zip(reference, got)
+            for a, b in zip(chunk_a, chunk_b)
+        )
+        report[f"workers_{count}_qps"] = round(queries / elapsed, 1)
+        report[f"workers_{count}_matches_single"] = same
+    return report
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Busca top-k paralela sobre matriz memory-mapped")
+    parser.add_argument("--index", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--workers", default=str(os.cpu_count() or 1), help="Lista de quantidades, ex.: 1,2,4")
+    parser.add_argument("--queries", type=int, default=256)
+    parser.add_argument("--batch", type=int, default=16, help="Consultas por chamada")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--synthetic-docs", type=int, help="Usa N vetores aleatórios em vez do índice")
+    parser.add_argument("--synthetic-dim", type=int, default=3072)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.synthetic_docs:
+        from kb_service import synthetic_engine
+
+        engine = synthetic_engine(args.synthetic_docs, args.synthetic_dim)
+    else:
+        engine = KnowledgeSearch.load(args.index)
+        if not engine.has_vector.any():
+            raise SystemExit(f"Nenhum documento com embedding em {args.index}.")
+    workers = [int(item) for item in args.workers.split(",") if item.strip()]
+    print(json.dumps(_benchmark(engine, workers, args.queries, args.batch, args.top_k), indent=2))
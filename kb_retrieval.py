@@ -0,0 +1,238 @@
+"""Camada de recuperação com cache de consultas sobre o kb_index.json.
+
+O atendimento repete muito as mesmas perguntas ("tempo de exposição iron mars 4",
+"peça rachando"). Esta camada mantém dois caches LRU com TTL:
+- consulta normalizada -> embedding (evita a chamada à API);
+- consulta normalizada + top_k + filtros -> resultados (evita a varredura).
+
+O cache de resultados é invalidado automaticamente quando o campo "generation"
+(ou "generated_at", em índices antigos) do kb_index.json muda. O de embeddings só
+é descartado se o modelo de embeddings do índice mudar. Os contadores de acerto
+ficam disponíveis em Retriever.stats().
+"""
+from __future__ import annotations
+
+import copy
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from kb_metadata import DEFAULT_OUTPUT, MODEL_NAME
+from kb_search import FilterValue, KnowledgeSearch
+
+EmbedFn = Callable[[List[str]], List[List[float]]]
+
+_MISSING = object()
+
+
+def normalize_query(text: str) -> str:
+    """Mesma normalização de normalizeText() em rag-search.js."""
+    text = unicodedata.normalize("NFD", (text or "").lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"[^a-z0-9\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class QueryCache:
+    """LRU limitado com expiração por TTL e contadores de acerto."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = 3600.0, clock=time.monotonic) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            stored_at, value = entry
+            if self.ttl_seconds is not None and self._clock() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def openai_embed_fn(model: str = MODEL_NAME) -> EmbedFn:
+    from openai import OpenAI  # type: ignore
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY não configurada no ambiente.")
+    client = OpenAI(api_key=api_key)
+
+    def embed(texts: List[str]) -> List[List[float]]:
+        response = client.embeddings.create(model=model, input=texts)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    return embed
+
+
+def index_generation(raw: dict) -> str:
+    return str(raw.get("generation") or raw.get("generated_at") or "")
+
+
+class Retriever:
+    def __init__(
+        self,
+        index_path: Path = DEFAULT_OUTPUT,
+        embed_fn: Optional[EmbedFn] = None,
+        embedding_cache_size: int = 4096,
+        result_cache_size: int = 1024,
+        ttl_seconds: Optional[float] = 3600.0,
+        check_interval: float = 1.0,
+    ) -> None:
+        self.index_path = Path(index_path)
+        self._embed_fn = embed_fn
+        self.embeddings = QueryCache(embedding_cache_size, ttl_seconds)
+        self.results = QueryCache(result_cache_size, ttl_seconds)
+        self.check_interval = check_interval
+        self.engine: Optional[KnowledgeSearch] = None
+        self._retired: Optional[KnowledgeSearch] = None
+        self.generation = ""
+        self.model: Optional[str] = None
+        self.reloads = 0
+        self.invalidations = 0
+        self._file_signature: Optional[Tuple[int, int]] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.refresh_if_stale(force=True)
+
+    @property
+    def embed_fn(self) -> EmbedFn:
+        if self._embed_fn is None:
+            self._embed_fn = openai_embed_fn(self.model or MODEL_NAME)
+        return self._embed_fn
+
+    def refresh_if_stale(self, force: bool = False) -> bool:
+        """Recarrega o índice se o arquivo mudou e a geração for outra."""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+
+        stat = self.index_path.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if not force and signature == self._file_signature:
+            return False
+
+        with self._lock:
+            raw = json.loads(self.index_path.read_text(encoding="utf-8"))
+            self._file_signature = signature
+            generation = index_generation(raw)
+            if not force and generation == self.generation:
+                return False
+
+            # Mesmo caminho do KnowledgeSearch.load: mantém content store, grafo kNN e cabeçalho.
+            previous, self.engine = self.engine, KnowledgeSearch.from_raw(raw, self.index_path)
+            # Uma busca em andamento pode ainda estar lendo o content store do motor
+            # anterior; ele fica aberto até a troca seguinte (ou close()), o que limita
+            # os handles abertos a dois.
+            if self._retired is not None:
+                self._retired.close()
+            self._retired = previous
+            if self.model is not None and raw.get("model") != self.model:
+                self.embeddings.clear()
+            if self.generation:
+                self.invalidations += 1
+            self.results.clear()
+            self.generation = generation
+            self.model = raw.get("model")
+            self.reloads += 1
+            return True
+
+    def embed(self, query: str) -> List[float]:
+        key = normalize_query(query)
+        vector = self.embeddings.get(key)
+        if vector is None:
+            vector = self.embed_fn([query])[0]
+            self.embeddings.put(key, vector)
+        return vector
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        filters: Optional[Dict[str, FilterValue]] = None,
+        min_score: Optional[float] = None,
+    ) -> List[dict]:
+        self.refresh_if_stale()
+        key = (self.generation, normalize_query(query), top_k, _freeze(filters), min_score)
+        cached = self.results.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        engine = self.engine
+        results = engine.search(self.embed(query), top_k=top_k, filters=filters, min_score=min_score)
+        self.results.put(key, results)
+        # Cópia profunda: quem altera hit["metadata"] não pode corromper o cache.
+        return copy.deepcopy(results)
+
+    def close(self) -> None:
+        with self._lock:
+            for engine in (self._retired, self.engine):
+                if engine is not None:
+                    engine.close()
+            self._retired = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "generation": self.generation,
+            "reloads": self.reloads,
+            "invalidations": self.invalidations,
+            "embeddings": self.embeddings.stats(),
+            "results": self.results.stats(),
+        }
+
+
+def _freeze(filters: Optional[Dict[str, FilterValue]]) -> Tuple:
+    if not filters:
+        return ()
+    frozen = []
+    for field, value in sorted(filters.items()):
+        values: Sequence[str] = [value] if isinstance(value, str) else sorted(value)
+        frozen.append((field, tuple(str(item).lower() for item in values)))
+    return tuple(frozen)
@@ -0,0 +1,209 @@
+"""Busca vetorial local sobre o kb_index.json com pré-filtro por metadados.
+
+O kb_build.py persiste, para cada documento, metadados (arquivo de origem,
+categoria, resinas citadas e tags) e um índice invertido em bitmaps no topo do
+kb_index.json ("filters"). Aqui os filtros são resolvidos antes da similaridade:
+só as linhas candidatas da matriz de embeddings são pontuadas.
+
+Exemplo:
+    engine = KnowledgeSearch.load(Path("kb_index.json"))
+    engine.search(query_vector, top_k=5, filters={"category": "troubleshooting", "resins": "iron"})
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from kb_content_store import ContentStore
+from kb_knn import embedding_matrix, load_knn_graph
+from kb_metadata import build_filter_index, decode_bitmap
+
+FilterValue = Union[str, Sequence[str]]
+
+
+class KnowledgeSearch:
+    def __init__(
+        self,
+        documents: List[dict],
+        filters: Optional[Dict[str, Dict[str, str]]] = None,
+        content_store: Optional[ContentStore] = None,
+        knn_graph: Optional[Path] = None,
+        **info,
+    ) -> None:
+        self.documents = documents
+        self.content_store = content_store
+        self.filters = filters if filters is not None else build_filter_index(documents)
+        self.info = info
+        self.knn_graph = knn_graph
+        self._graph: Optional[dict] = None
+        self._positions: Optional[Dict[str, int]] = None
+
+        self.matrix, self.has_vector = embedding_matrix(documents)
+        self.dimensions = self.matrix.shape[1]
+        self.last_scored = 0
+
+    @classmethod
+    def load(cls, index_path: Path) -> "KnowledgeSearch":
+        return cls.from_raw(json.loads(Path(index_path).read_text(encoding="utf-8")), index_path)
+
+    @classmethod
+    def from_raw(cls, raw, index_path: Path) -> "KnowledgeSearch":
+        """Monta a busca a partir do JSON já lido; caminhos relativos partem de index_path."""
+        documents = raw.get("documents", []) if isinstance(raw, dict) else raw
+        header = raw if isinstance(raw, dict) else {}
+        store_name = header.get("content_store")
+        graph_name = header.get("knn_graph")
+        return cls(
+            documents,
+            filters=header.get("filters"),
+            content_store=ContentStore(Path(index_path).parent / store_name) if store_name else None,
+            knn_graph=Path(index_path).parent / graph_name if graph_name else Path(index_path).with_suffix(".knn.npz"),
+            model=header.get("model"),
+            generated_at=header.get("generated_at"),
+            tokenizer=header.get("tokenizer"),
+            generation=header.get("generation"),
+        )
+
+    def close(self) -> None:
+        """Fecha o content store (se houver); os documentos em memória continuam utilizáveis."""
+        if self.content_store is not None:
+            self.content_store.close()
+
+    def __enter__(self) -> "KnowledgeSearch":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def candidates(self, filters: Optional[Dict[str, FilterValue]] = None) -> np.ndarray:
+        """Máscara booleana: AND entre campos, OR entre valores do mesmo campo."""
+        size = len(self.documents)
+        mask = self.has_vector.copy()
+        for field, wanted in (filters or {}).items():
+            if field not in self.filters:
+                raise KeyError(f"Filtro desconhecido: {field}")
+            values = [wanted] if isinstance(wanted, str) else list(wanted)
+            field_mask = np.zeros(size, dtype=bool)
+            for value in values:
+                encoded = self.filters[field].get(str(value).lower())
+                if encoded:
+                    field_mask |= decode_bitmap(encoded, size)
+            mask &= field_mask
+        return mask
+
+    def normalize_query(self, query_vector: Sequence[float]) -> np.ndarray:
+        """Vetor de consulta com norma 1, conferindo a dimensão do índice."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.shape[-1] != self.dimensions:
+            raise ValueError(f"Dimensão da consulta ({query.shape[-1]}) difere do índice ({self.dimensions})")
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        top_k: int = 5,
+        filters: Optional[Dict[str, FilterValue]] = None,
+        min_score: Optional[float] = None,
+    ) -> List[dict]:
+        rows = np.flatnonzero(self.candidates(filters))
+        self.last_scored = int(rows.size)
+        if rows.size == 0:
+            return []
+
+        scores = self.matrix[rows] @ self.normalize_query(query_vector)
+        return self._top_k(rows, scores, top_k, min_score)
+
+    def search_batch(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        top_k: Union[int, Sequence[int]] = 5,
+        filters: Optional[Sequence[Optional[Dict[str, FilterValue]]]] = None,
+        min_score: Optional[float] = None,
+    ) -> List[List[dict]]:
+        """Pontua várias consultas com uma única multiplicação de matrizes.
+
+        Só entram na multiplicação as linhas candidatas de alguma consulta do lote
+        (união das máscaras); cada consulta depois recorta as suas.
+        """
+        queries = np.vstack([self.normalize_query(vector) for vector in query_vectors])
+        top_ks = [top_k] * len(queries) if isinstance(top_k, int) else list(top_k)
+        masks = [self.candidates(item) for item in (filters or [None] * len(queries))]
+
+        union = np.flatnonzero(np.logical_or.reduce(masks))
+        scores = queries @ self.matrix[union].T
+        self.last_scored = int(scores.size)
+
+        batch_results = []
+        for row_scores, mask, k in zip(scores, masks, top_ks):
+            local = mask[union]
+            if not local.any():
+                batch_results.append([])
+                continue
+            batch_results.append(self._top_k(union[local], row_scores[local], k, min_score))
+        return batch_results
+
+    def _top_k(self, rows: np.ndarray, scores: np.ndarray, top_k: int, min_score: Optional[float]) -> List[dict]:
+        if top_k < 1:
+            raise ValueError(f"top_k deve ser >= 1 (recebido {top_k})")
+        k = min(top_k, rows.size)
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        results = []
+        for idx in best:
+            score = float(scores[idx])
+            if min_score is not None and score < min_score:
+                break
+            results.append(self.result(int(rows[idx]), score))
+        return results
+
+    def result(self, position: int, score: float) -> dict:
+        doc = self.documents[position]
+        title, content = doc.get("title"), doc.get("content")
+        if content is None and self.content_store is not None:
+            passage = self.content_store.get(doc.get("id")) or {}
+            title, content = passage.get("title"), passage.get("content")
+        return {
+            "id": doc.get("id"),
+            "title": title,
+            "content": content,
+            "category": doc.get("category"),
+            "metadata": doc.get("metadata") or {},
+            "similarity": score,
+        }
+
+    def _load_graph(self) -> dict:
+        if self._graph is None:
+            if self.knn_graph is None or not Path(self.knn_graph).exists():
+                raise FileNotFoundError("Índice sem grafo kNN; gere com kb_build.py --knn K")
+            graph = load_knn_graph(self.knn_graph)
+            if graph["generation"] != self.info.get("generation") or len(graph["neighbors"]) != len(self.documents):
+                raise ValueError(f"Grafo kNN {self.knn_graph} é de outra geração do índice; rode kb_build.py --knn de novo")
+            self._graph = graph
+        return self._graph
+
+    def related(self, doc_id: str, top_k: Optional[int] = None) -> List[dict]:
+        """Vizinhos pré-calculados ("mais como este"), sem varrer a matriz."""
+        if self._positions is None:
+            self._positions = {doc.get("id"): position for position, doc in enumerate(self.documents)}
+        position = self._positions.get(doc_id)
+        if position is None:
+            raise KeyError(f"Documento desconhecido: {doc_id}")
+        graph = self._load_graph()
+        neighbors = graph["neighbors"][position][:top_k]
+        scores = graph["scores"][position][:top_k]
+        return [self.result(int(row), float(score)) for row, score in zip(neighbors, scores) if row >= 0]
+
+    def expand(self, results: List[dict], per_hit: int = 2) -> List[dict]:
+        """Acrescenta aos resultados os vizinhos de cada hit que ainda não estão na lista."""
+        seen = {hit["id"] for hit in results}
+        expanded = list(results)
+        for hit in results:
+            for neighbor in self.related(hit["id"], per_hit):
+                if neighbor["id"] not in seen:
+                    seen.add(neighbor["id"])
+                    expanded.append({**neighbor, "expanded_from": hit["id"]})
+        return expanded
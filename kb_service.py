@@ -0,0 +1,292 @@
+"""Serviço local (asyncio) de recuperação top-k sobre o índice do kb_build.py.
+
+Requisições concorrentes são agrupadas numa janela curta (micro-batching) e
+pontuadas com uma única multiplicação de matrizes, em vez de um laço de
+cosineSimilarity por documento e por requisição como em rag-search.js.
+Funciona totalmente offline: as consultas chegam já como vetores.
+
+Uso:
+    python kb_service.py --index kb_index.json --port 8765
+    python kb_service.py --unix /tmp/kb.sock
+    python kb_service.py --synthetic-docs 20000 --synthetic-dim 3072   # benchmark
+
+Endpoints:
+    POST /search  {"vector": [...], "top_k": 5, "filters": {"category": "troubleshooting"}}
+    GET  /health
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from kb_metadata import DEFAULT_OUTPUT
+from kb_search import KnowledgeSearch
+
+DEFAULT_WINDOW_MS = 2.0
+DEFAULT_MAX_BATCH = 64
+DEFAULT_TOP_K = 5
+MAX_BODY_BYTES = 1 << 20
+
+
+class MicroBatcher:
+    """Acumula consultas por até window_ms (ou max_batch itens) e as pontua juntas."""
+
+    def __init__(self, engine: KnowledgeSearch, window_ms: float = DEFAULT_WINDOW_MS, max_batch: int = DEFAULT_MAX_BATCH):
+        self.engine = engine
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.queue: "asyncio.Queue[Tuple[np.ndarray, int, Optional[dict], asyncio.Future]]" = asyncio.Queue()
+        self.batches = 0
+        self.queries = 0
+        self.largest_batch = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, vector: Sequence[float], top_k: int, filters: Optional[dict]) -> List[dict]:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((vector, top_k, filters, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[Any, int, Optional[dict], asyncio.Future]]:
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            self.batches += 1
+            self.queries += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            try:
+                results = await asyncio.to_thread(
+                    self.engine.search_batch,
+                    [item[0] for item in batch],
+                    [item[1] for item in batch],
+                    [item[2] for item in batch],
+                )
+            except Exception:  # noqa: BLE001 - isola a consulta ruim em vez de falhar o lote
+                await self._run_isolated(batch)
+                continue
+            for (*_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _run_isolated(self, batch: List[Tuple[Any, int, Optional[dict], asyncio.Future]]) -> None:
+        """Repontua cada consulta sozinha: só a que provocou o erro recebe a exceção."""
+        for vector, top_k, filters, future in batch:
+            try:
+                result = await asyncio.to_thread(self.engine.search_batch, [vector], [top_k], [filters])
+            except Exception as exc:  # noqa: BLE001 - entregue a quem fez a consulta
+                if not future.done():
+                    future.set_exception(exc)
+                continue
+            if not future.done():
+                future.set_result(result[0])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch": round(self.queries / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "window_ms": self.window * 1000.0,
+            "max_batch": self.max_batch,
+        }
+
+
+class RetrievalService:
+    def __init__(self, engine: KnowledgeSearch, window_ms: float, max_batch: int) -> None:
+        self.engine = engine
+        self.batcher = MicroBatcher(engine, window_ms, max_batch)
+        self.started_at = time.time()
+
+    def parse_request(self, payload: dict) -> Tuple[np.ndarray, int, Optional[dict]]:
+        """Valida a consulta antes de entrar no lote; ValueError vira 400 só para ela."""
+        if not isinstance(payload, dict):
+            raise ValueError("corpo deve ser um objeto JSON")
+        vector = payload.get("vector")
+        if not isinstance(vector, list) or len(vector) != self.engine.dimensions:
+            raise ValueError(f"'vector' deve ter {self.engine.dimensions} dimensões")
+        try:
+            query = np.asarray(vector, dtype=float)
+        except (TypeError, ValueError):
+            raise ValueError("'vector' deve conter apenas números") from None
+        if not np.isfinite(query).all():
+            raise ValueError("'vector' contém valores não finitos")
+
+        top_k = payload.get("top_k", DEFAULT_TOP_K)
+        if isinstance(top_k, bool) or not isinstance(top_k, int) or top_k < 1:
+            raise ValueError("'top_k' deve ser um inteiro >= 1")
+
+        filters = payload.get("filters") or None
+        if filters is not None:
+            if not isinstance(filters, dict):
+                raise ValueError("'filters' deve ser um objeto")
+            unknown = [str(field) for field in filters if field not in self.engine.filters]
+            if unknown:
+                raise ValueError(f"Filtros desconhecidos: {', '.join(unknown)}")
+            for field, wanted in filters.items():
+                values = [wanted] if isinstance(wanted, str) else wanted
+                if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+                    raise ValueError(f"Filtro '{field}' deve ser texto ou lista de textos")
+        return query, top_k, filters
+
+    async def handle_search(self, payload: dict) -> Tuple[int, dict]:
+        try:
+            results = await self.batcher.submit(*self.parse_request(payload))
+        except (KeyError, ValueError) as exc:
+            return 400, {"error": str(exc.args[0]) if exc.args else str(exc)}
+        if not payload.get("include_content"):
+            results = [{key: value for key, value in result.items() if key != "content"} for result in results]
+        return 200, {"results": results}
+
+    def health(self) -> dict:
+        return {
+            "status": "ok",
+            "documents": len(self.engine.documents),
+            "dimensions": self.engine.dimensions,
+            "generated_at": self.engine.info.get("generated_at"),
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "batching": self.batcher.stats(),
+        }
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin1").split(" ", 2)
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "corpo muito grande"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                if method == "GET" and path == "/health":
+                    status, response = 200, self.health()
+                elif method == "POST" and path == "/search":
+                    try:
+                        status, response = await self.handle_search(json.loads(body or b"{}"))
+                    except (ValueError, TypeError) as exc:
+                        status, response = 400, {"error": f"JSON inválido: {exc}"}
+                else:
+                    status, response = 404, {"error": "rota não encontrada"}
+
+                keep_alive = headers.get("connection", "keep-alive").lower() != "close"
+                await self._respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large"}.get(status, "Error")
+        head = (
+            f"HTTP/1.1 {status} {reason}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin1") + body)
+        await writer.drain()
+
+
+def synthetic_engine(docs: int, dim: int, seed: int = 7) -> KnowledgeSearch:
+    rng = np.random.default_rng(seed)
+    matrix = rng.standard_normal((docs, dim), dtype=np.float32)
+    documents = [
+        {"id": f"synthetic_{idx}", "title": f"Documento {idx}", "content": "", "embedding": matrix[idx]}
+        for idx in range(docs)
+    ]
+    return KnowledgeSearch(documents, filters={}, generated_at="synthetic")
+
+
+async def serve(args: argparse.Namespace) -> None:
+    if args.synthetic_docs:
+        engine = synthetic_engine(args.synthetic_docs, args.synthetic_dim)
+    else:
+        engine = KnowledgeSearch.load(args.index)
+    if not engine.has_vector.any():
+        raise SystemExit(f"Nenhum documento com embedding em {args.index}. Gere o índice sem --dry-run.")
+
+    service = RetrievalService(engine, args.window_ms, args.max_batch)
+    service.batcher.start()
+
+    if args.unix:
+        server = await asyncio.start_unix_server(service.handle_connection, path=str(args.unix))
+        where = f"unix:{args.unix}"
+    else:
+        server = await asyncio.start_server(service.handle_connection, args.host, args.port)
+        where = f"http://{args.host}:{args.port}"
+
+    print(
+        f"🚀 kb_service em {where} — {int(engine.has_vector.sum())} documentos, "
+        f"{engine.dimensions} dimensões, janela {args.window_ms}ms, lote máx. {args.max_batch}"
+    )
+    async with server:
+        try:
+            await server.serve_forever()
+        finally:
+            await service.batcher.stop()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serviço local de recuperação com micro-batching")
+    parser.add_argument("--index", type=Path, default=DEFAULT_OUTPUT, help="kb_index.json gerado pelo kb_build.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", type=Path, help="Escuta num Unix socket em vez de TCP")
+    parser.add_argument("--window-ms", type=float, default=DEFAULT_WINDOW_MS, help="Janela de agrupamento das consultas")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="Consultas máximas por lote")
+    parser.add_argument("--synthetic-docs", type=int, help="Ignora --index e usa N vetores aleatórios (benchmark)")
+    parser.add_argument("--synthetic-dim", type=int, default=3072)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve(parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,47 @@
+"""Contagem de tokens compartilhada por quem grava o índice e por quem monta contexto.
+
+O kb_build.py grava o token_count de cada documento e o nome do tokenizer no
+cabeçalho do kb_index.json; o kb_context.py usa as mesmas funções para o
+orçamento em tempo de consulta, sem importar o script de build.
+"""
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+
+try:
+    import tiktoken  # type: ignore
+except Exception:  # pragma: no cover - import guard
+    tiktoken = None  # type: ignore
+
+# Tokenizer do gpt-4o / gpt-4o-mini usados pelo rag-search.js.
+TOKEN_ENCODING = "o200k_base"
+APPROX_TOKENIZER = "approx"
+APPROX_TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]|\n")
+
+
+@lru_cache(maxsize=1)
+def _token_encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception:  # sem rede para baixar o BPE, por exemplo
+        return None
+
+
+def tokenizer_name() -> str:
+    return TOKEN_ENCODING if _token_encoding() is not None else APPROX_TOKENIZER
+
+
+def count_tokens(text: str) -> int:
+    """Tokens pelo tiktoken; sem ele, uma estimativa conservadora (pedaços de até 4 letras)."""
+    encoding = _token_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(APPROX_TOKEN_PATTERN.findall(text))
+
+
+def document_block_body(doc: dict) -> str:
+    """Parte do bloco do formatContext que depende do documento (após "**Documento N:**")."""
+    return f" {doc.get('title') or ''}\n{doc.get('content') or ''}\n\n"
@@ -0,0 +1,143 @@
+"""Modo --watch do kb_build.py: indexação contínua da base de conhecimento.
+
+Faz polling (mtime + tamanho, só biblioteca padrão) da pasta rag-knowledge, do
+digest de parâmetros, do autômato de entidades e das exportações de parâmetros
+(.xlsx/.html). Uma rajada de edições é agrupada: o ciclo só começa depois que
+nada mudou durante a janela de debounce. Então:
+
+1. planilhas/HTML alterados rodam o importador correspondente (que regrava o
+   digest e o autômato em data/);
+2. o build_index roda de forma incremental: só .txt novos ou com texto alterado
+   e chunks do digest com hash diferente são reembutidos; arquivos removidos saem
+   do índice;
+3. o índice é gravado uma única vez, por troca atômica (os.replace), com um novo
+   "generation" — quem lê nunca vê um arquivo pela metade e os caches do
+   kb_retrieval.py invalidam sozinhos.
+
+Uso:
+    python kb_build.py --watch --watch-params planilhas/parametros.xlsx
+"""
+from __future__ import annotations
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from scripts.print_params_digest import GROUPED_DIGEST_NAME
+
+SCRIPTS_DIR = Path(__file__).resolve().parent / "scripts"
+IMPORTERS = {
+    ".xlsx": "import_print_params_from_excel.py",
+    ".xls": "import_print_params_from_excel.py",
+    ".html": "import_print_params_from_html.py",
+    ".htm": "import_print_params_from_html.py",
+}
+
+Snapshot = Dict[Path, Tuple[float, int]]
+
+
+def snapshot(paths: Iterable[Path]) -> Snapshot:
+    """mtime/tamanho de cada arquivo; pastas entram com todos os .txt de dentro."""
+    state: Snapshot = {}
+    for path in paths:
+        targets = sorted(path.glob("*.txt")) if path.is_dir() else [path]
+        for target in targets:
+            try:
+                stat = target.stat()
+            except FileNotFoundError:
+                continue
+            state[target] = (stat.st_mtime, stat.st_size)
+    return state
+
+
+def changed_paths(before: Snapshot, after: Snapshot) -> List[Path]:
+    return sorted(path for path in set(before) | set(after) if before.get(path) != after.get(path))
+
+
+def importer_command(source: Path, params_digest: Path) -> List[str]:
+    """Linha de comando do importador que regrava o digest na pasta de params_digest."""
+    script = IMPORTERS.get(source.suffix.lower())
+    if script is None:
+        raise SystemExit(f"Formato de exportação de parâmetros não suportado: {source}")
+    data_dir = params_digest.parent
+    if script.endswith("excel.py"):
+        # O importador do Excel grava em <output_dir>/data/.
+        command = [sys.executable, str(SCRIPTS_DIR / script), str(source), str(data_dir.parent)]
+    else:
+        command = [sys.executable, str(SCRIPTS_DIR / script), str(source), str(data_dir / "resins_extracted.json")]
+    if params_digest.name == GROUPED_DIGEST_NAME:
+        command.append("--grouped-digest")
+    return command
+
+
+def run_importers(sources: List[Path], params_digest: Path) -> bool:
+    ok = True
+    for source in sources:
+        print(f"📥 Reimportando parâmetros de {source}")
+        result = subprocess.run(importer_command(source, params_digest))
+        if result.returncode != 0:
+            print(f"⚠️  Importador falhou para {source} (código {result.returncode}); mantendo o digest anterior.")
+            ok = False
+    return ok
+
+
+def wait_for_quiet(paths: List[Path], current: Snapshot, poll: float, debounce: float) -> Snapshot:
+    """Continua observando até a janela de debounce passar sem mudanças."""
+    quiet_since = time.monotonic()
+    while time.monotonic() - quiet_since < debounce:
+        time.sleep(min(poll, debounce))
+        latest = snapshot(paths)
+        if latest != current:
+            current = latest
+            quiet_since = time.monotonic()
+    return current
+
+
+def watch(
+    build: Callable[..., int],
+    input_dir: Path,
+    params_digest: Optional[Path],
+    entities_path: Optional[Path],
+    param_sources: List[Path],
+    poll: float = 2.0,
+    debounce: float = 3.0,
+    max_cycles: Optional[int] = None,
+) -> None:
+    """Laço principal; `build` é o build_index já com os argumentos fixos do CLI."""
+    index_inputs = [input_dir] + [path for path in (params_digest, entities_path) if path is not None]
+    watched = index_inputs + list(param_sources)
+
+    print(f"👀 Observando {', '.join(str(path) for path in watched)} (poll {poll}s, debounce {debounce}s)")
+    build(refresh_changed=True, prune_missing=True, checkpoint=False)
+    state = snapshot(watched)
+
+    cycles = 0
+    while max_cycles is None or cycles < max_cycles:
+        time.sleep(poll)
+        latest = snapshot(watched)
+        if latest == state:
+            continue
+
+        latest = wait_for_quiet(watched, latest, poll, debounce)
+        changes = changed_paths(state, latest)
+        print(f"🔔 {len(changes)} arquivo(s) alterado(s): {', '.join(path.name for path in changes[:10])}")
+
+        sources = [path for path in param_sources if path in changes and path.exists()]
+        if sources and params_digest is not None:
+            run_importers(sources, params_digest)
+
+        started = time.perf_counter()
+        try:
+            updated = build(refresh_changed=True, prune_missing=True, checkpoint=False)
+            print(f"⏱️  Ciclo concluído em {time.perf_counter() - started:.1f}s ({updated} alterações publicadas)")
+        except Exception as exc:  # noqa: BLE001 - o watcher não pode morrer por um ciclo ruim
+            print(f"⚠️  Falha ao reconstruir o índice: {exc}. Nova tentativa na próxima alteração.")
+        except SystemExit as exc:
+            print(f"⚠️  {exc}. Nova tentativa na próxima alteração.")
+
+        # Edições feitas durante o build (e o digest regravado pelos importadores)
+        # disparam o próximo ciclo, que só reprocessa o que de fato mudou.
+        state = latest
+        cycles += 1
@@ -0,0 +1 @@
+"""Python tooling for the knowledge base: print-parameter importers and their helpers."""
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Resin/printer entity extractor backed by an Aho-Corasick automaton.
+
+The importers compile every resin name, brand and model string (plus their slug
+variants) from the print-parameters database into a serialized automaton
+(entity-automaton.json). At chat time a message is scanned once, left to right,
+and every catalog mention is returned regardless of how many names exist.
+
+Usage:
+  python scripts/entity_extractor.py <entity-automaton.json> "tempo de exposição iron mars 4"
+  python scripts/entity_extractor.py <entity-automaton.json> --benchmark 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+import unicodedata
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+AUTOMATON_VERSION = 1
+MIN_PATTERN_LENGTH = 2
+
+
+def normalize_with_offsets(text: str) -> Tuple[str, List[int]]:
+    """Lowercase, strip accents and collapse non-alphanumerics into single spaces.
+
+    Returns the normalized string and, for each of its characters, the index of
+    the originating character in ``text`` so hits can be mapped back.
+    """
+    chars: List[str] = []
+    offsets: List[int] = []
+    for idx, char in enumerate(text or ""):
+        base = unicodedata.normalize("NFD", char.lower())[:1]
+        if ("a" <= base <= "z") or ("0" <= base <= "9"):
+            chars.append(base)
+            offsets.append(idx)
+        elif chars and chars[-1] != " ":
+            chars.append(" ")
+            offsets.append(idx)
+    if chars and chars[-1] == " ":
+        chars.pop()
+        offsets.pop()
+    return "".join(chars), offsets
+
+
+def normalize(text: str) -> str:
+    return normalize_with_offsets(text)[0]
+
+
+def pattern_variants(text: str) -> List[str]:
+    """Spaced and compact forms of a name ("iron_7030" -> "iron 7030", "iron7030")."""
+    spaced = normalize(str(text).replace("_", " "))
+    variants = [spaced]
+    compact = spaced.replace(" ", "")
+    if compact != spaced:
+        variants.append(compact)
+    return [variant for variant in variants if len(variant) >= MIN_PATTERN_LENGTH]
+
+
+def collect_catalog_patterns(database: Dict[str, Any]) -> Dict[str, List[Dict[str, str]]]:
+    """Map each normalized pattern to the catalog entities it identifies."""
+    patterns: Dict[str, List[Dict[str, str]]] = {}
+
+    def add(raw: str, entity_type: str, entity_id: str) -> None:
+        if not raw or not entity_id:
+            return
+        for variant in pattern_variants(raw):
+            entities = patterns.setdefault(variant, [])
+            entity = {"type": entity_type, "id": entity_id}
+            if entity not in entities:
+                entities.append(entity)
+
+    resins: Dict[str, str] = {}
+    for resin in database.get("resins", []):
+        resins.setdefault(resin.get("id", ""), resin.get("name", ""))
+    for profile in database.get("profiles", []):
+        resins.setdefault(profile.get("resinId", ""), profile.get("resinName", ""))
+
+    for resin_id, name in resins.items():
+        add(name, "resin", resin_id)
+        add(resin_id, "resin", resin_id)
+
+    for printer in database.get("printers", []):
+        printer_id = printer.get("id", "")
+        brand = printer.get("brand", "") or ""
+        model = printer.get("model", "") or ""
+        brand_id = printer_id.split("__", 1)[0]
+        add(brand, "brand", brand_id)
+        add(model, "printer", printer_id)
+        add(f"{brand} {model}", "printer", printer_id)
+
+    return patterns
+
+
+def build_automaton(patterns: Dict[str, List[Dict[str, str]]]) -> Dict[str, Any]:
+    """Compile patterns into goto/fail/output tables (JSON serializable)."""
+    pattern_list = sorted(patterns)
+    goto: List[Dict[str, int]] = [{}]
+    output: List[List[int]] = [[]]
+
+    for pattern_idx, pattern in enumerate(pattern_list):
+        state = 0
+        for char in pattern:
+            nxt = goto[state].get(char)
+            if nxt is None:
+                nxt = len(goto)
+                goto[state][char] = nxt
+                goto.append({})
+                output.append([])
+            state = nxt
+        output[state].append(pattern_idx)
+
+    fail = [0] * len(goto)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for char, nxt in goto[state].items():
+            queue.append(nxt)
+            fallback = fail[state]
+            while fallback and char not in goto[fallback]:
+                fallback = fail[fallback]
+            candidate = goto[fallback].get(char, 0)
+            fail[nxt] = candidate if candidate != nxt else 0
+            output[nxt].extend(output[fail[nxt]])
+
+    return {
+        "version": AUTOMATON_VERSION,
+        "normalization": "nfd-lower-alnum",
+        "patterns": [{"text": pattern, "entities": patterns[pattern]} for pattern in pattern_list],
+        "goto": goto,
+        "fail": fail,
+        "output": output,
+    }
+
+
+def build_entity_automaton(database: Dict[str, Any]) -> Dict[str, Any]:
+    return build_automaton(collect_catalog_patterns(database))
+
+
+def write_entity_automaton(database: Dict[str, Any], output_path: Path) -> Dict[str, Any]:
+    automaton = build_entity_automaton(database)
+    Path(output_path).write_text(json.dumps(automaton, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    return automaton
+
+
+class EntityExtractor:
+    """Finds every catalog mention in a message with a single automaton pass."""
+
+    def __init__(self, automaton: Dict[str, Any]) -> None:
+        if automaton.get("version") != AUTOMATON_VERSION:
+            raise ValueError(f"Unsupported automaton version: {automaton.get('version')}")
+        self.patterns = automaton["patterns"]
+        self.goto = automaton["goto"]
+        self.fail = automaton["fail"]
+        self.output = automaton["output"]
+
+    @classmethod
+    def load(cls, path: Path) -> "EntityExtractor":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    @classmethod
+    def from_database(cls, database: Dict[str, Any]) -> "EntityExtractor":
+        return cls(build_entity_automaton(database))
+
+    def extract(self, message: str) -> List[Dict[str, Any]]:
+        text, offsets = normalize_with_offsets(message)
+        goto, fail, output = self.goto, self.fail, self.output
+        hits: List[Dict[str, Any]] = []
+        state = 0
+        last = len(text) - 1
+
+        for pos, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not output[state]:
+                continue
+            if pos < last and text[pos + 1] != " ":
+                continue
+            for pattern_idx in output[state]:
+                pattern = self.patterns[pattern_idx]
+                start = pos - len(pattern["text"]) + 1
+                if start > 0 and text[start - 1] != " ":
+                    continue
+                for entity in pattern["entities"]:
+                    hits.append(
+                        {
+                            "type": entity["type"],
+                            "id": entity["id"],
+                            "pattern": pattern["text"],
+                            "start": offsets[start],
+                            "end": offsets[pos] + 1,
+                        }
+                    )
+
+        return hits
+
+
+def select_longest(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop hits whose span lies strictly inside a longer hit ("iron" within "iron 7030")."""
+    return [
+        hit
+        for hit in hits
+        if not any(
+            other["start"] <= hit["start"]
+            and hit["end"] <= other["end"]
+            and (other["end"] - other["start"]) > (hit["end"] - hit["start"])
+            for other in hits
+        )
+    ]
+
+
+def naive_extract(patterns: Iterable[Dict[str, Any]], message: str) -> List[Dict[str, Any]]:
+    """Reference implementation: one substring scan per pattern."""
+    text, offsets = normalize_with_offsets(message)
+    hits: List[Dict[str, Any]] = []
+    for pattern in patterns:
+        needle = pattern["text"]
+        start = text.find(needle)
+        while start != -1:
+            end = start + len(needle)
+            if (start == 0 or text[start - 1] == " ") and (end == len(text) or text[end] == " "):
+                for entity in pattern["entities"]:
+                    hits.append(
+                        {
+                            "type": entity["type"],
+                            "id": entity["id"],
+                            "pattern": needle,
+                            "start": offsets[start],
+                            "end": offsets[end - 1] + 1,
+                        }
+                    )
+            start = text.find(needle, start + 1)
+    return hits
+
+
+def _hit_key(hit: Dict[str, Any]) -> Tuple[int, int, str, str]:
+    return hit["start"], hit["end"], hit["type"], hit["id"]
+
+
+def run_benchmark(extractor: EntityExtractor, messages: int, seed: int = 42) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    filler = "qual o tempo de exposição ideal para a minha impressora com a resina está rachando peça".split()
+    names = [pattern["text"] for pattern in extractor.patterns]
+    corpus = []
+    for _ in range(messages):
+        words = rng.sample(filler, 8) + rng.sample(names, min(2, len(names)))
+        rng.shuffle(words)
+        corpus.append(" ".join(words))
+
+    started = time.perf_counter()
+    fast = [extractor.extract(message) for message in corpus]
+    automaton_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    slow = [naive_extract(extractor.patterns, message) for message in corpus]
+    naive_s = time.perf_counter() - started
+
+    mismatches = sum(
+        1 for a, b in zip(fast, slow) if sorted(map(_hit_key, a)) != sorted(map(_hit_key, b))
+    )
+    return {
+        "messages": messages,
+        "patterns": len(names),
+        "automatonSeconds": round(automaton_s, 4),
+        "naiveSeconds": round(naive_s, 4),
+        "speedup": round(naive_s / automaton_s, 2) if automaton_s else None,
+        "mismatches": mismatches,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Extract resin/printer mentions from a message")
+    parser.add_argument("automaton", type=Path, help="entity-automaton.json or print-parameters-db.json")
+    parser.add_argument("message", nargs="*", help="Message to scan")
+    parser.add_argument("--benchmark", type=int, metavar="N", help="Compare against naive scanning over N messages")
+    args = parser.parse_args()
+
+    raw = json.loads(args.automaton.read_text(encoding="utf-8"))
+    extractor = EntityExtractor.from_database(raw) if "profiles" in raw else EntityExtractor(raw)
+
+    if args.benchmark:
+        print(json.dumps(run_benchmark(extractor, args.benchmark), indent=2))
+    if args.message:
+        print(json.dumps(extractor.extract(" ".join(args.message)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI embeddings endpoint, for offline load testing.
+
+Speaks POST /v1/embeddings ({"model", "input": str | [str], "dimensions"?,
+"encoding_format"?: "float" | "base64"}) and answers in the same response shape,
+so both the official client (OPENAI_BASE_URL=http://127.0.0.1:8089/v1) and
+kb_build.py --embed-provider http can point at it. Vectors are deterministic:
+the same text always gets the same unit vector, seeded from its SHA-256.
+
+Knobs to exercise the client's batching, concurrency and retry paths:
+  --latency-ms / --per-item-ms / --jitter-ms   simulated service time
+  --error-rate                                 fraction of requests answered with 500
+  --rpm / --tpm                                token-bucket rate limits, answered with 429 + Retry-After
+                                               (a single request above --tpm is rejected with 400)
+  --max-inputs                                 larger batches are rejected with 400
+
+GET /stats returns the request, text, error and rate-limit counters.
+
+Usage:
+  python scripts/fake_embeddings_server.py --port 8089 --latency-ms 80 --error-rate 0.05 --rpm 600
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_DIM = 3072  # text-embedding-3-large
+
+
+def fake_embedding(text: str, dim: int, model: str = "") -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(f"{model}\0{text}".encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute; take() returns the wait in seconds (0 = allowed).
+
+    Callers must not ask for more than `capacity` at once; such a request never fits.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def take(self, amount: float) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if amount <= self.tokens:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+
+class FakeEmbeddings:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.request_bucket = TokenBucket(args.rpm) if args.rpm else None
+        self.token_bucket = TokenBucket(args.tpm) if args.tpm else None
+        self.counters: Dict[str, int] = {
+            "requests": 0,
+            "texts": 0,
+            "ok": 0,
+            "errors_500": 0,
+            "rate_limited_429": 0,
+            "bad_request_400": 0,
+        }
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self.lock:
+            self.counters[name] += value
+
+    def admit(self, tokens: int) -> Optional[float]:
+        """None when allowed, otherwise the Retry-After in seconds."""
+        with self.lock:
+            for bucket, amount in ((self.request_bucket, 1), (self.token_bucket, tokens)):
+                if bucket is None:
+                    continue
+                wait = bucket.take(amount)
+                if wait:
+                    return wait
+            return None
+
+    def handle(self, body: dict) -> Tuple[int, dict, Dict[str, str]]:
+        self.count("requests")
+        inputs = body.get("input")
+        texts: List[str] = [inputs] if isinstance(inputs, str) else list(inputs or [])
+        if not texts or not all(isinstance(text, str) for text in texts):
+            self.count("bad_request_400")
+            return 400, {"error": {"message": "'input' must be a string or a list of strings", "type": "invalid_request_error"}}, {}
+        if len(texts) > self.args.max_inputs:
+            self.count("bad_request_400")
+            return 400, {"error": {"message": f"at most {self.args.max_inputs} inputs per request", "type": "invalid_request_error"}}, {}
+
+        tokens = sum(approx_tokens(text) for text in texts)
+        if self.token_bucket is not None and tokens > self.token_bucket.capacity:
+            # Could never be admitted: a 429 here would keep the client retrying forever.
+            self.count("bad_request_400")
+            message = f"request has ~{tokens} tokens, more than the {self.args.tpm:g} tokens-per-minute limit"
+            return 400, {"error": {"message": message, "type": "invalid_request_error"}}, {}
+        wait = self.admit(tokens)
+        if wait is not None:
+            self.count("rate_limited_429")
+            return 429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}}, {"Retry-After": f"{wait:.2f}"}
+
+        with self.lock:
+            failed = self.random.random() < self.args.error_rate
+            jitter = self.random.uniform(0, self.args.jitter_ms)
+        time.sleep((self.args.latency_ms + self.args.per_item_ms * len(texts) + jitter) / 1000.0)
+        if failed:
+            self.count("errors_500")
+            return 500, {"error": {"message": "Simulated server error", "type": "server_error"}}, {}
+
+        model = str(body.get("model") or "text-embedding-3-large")
+        dim = int(body.get("dimensions") or self.args.dim)
+        as_base64 = body.get("encoding_format") == "base64"
+        data = []
+        for index, text in enumerate(texts):
+            vector = fake_embedding(text, dim, model)
+            embedding = base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii") if as_base64 else vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+
+        self.count("ok")
+        self.count("texts", len(texts))
+        return 200, {"object": "list", "data": data, "model": model, "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}, {}
+
+
+def make_handler(service: FakeEmbeddings):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def send_json(self, status: int, payload: dict, headers: Optional[Dict[str, str]] = None) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:  # noqa: N802 - http.server API
+            if self.path.rstrip("/") in ("/stats", "/health"):
+                with service.lock:
+                    self.send_json(200, dict(service.counters))
+            else:
+                self.send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self) -> None:  # noqa: N802 - http.server API
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length)
+            if self.path.rstrip("/") not in ("/v1/embeddings", "/embeddings"):
+                self.send_json(404, {"error": {"message": "not found"}})
+                return
+            try:
+                body = json.loads(raw or b"{}")
+            except json.JSONDecodeError:
+                self.send_json(400, {"error": {"message": "invalid JSON body"}})
+                return
+            self.send_json(*service.handle(body))
+
+        def log_message(self, format: str, *args) -> None:  # noqa: A002 - http.server API
+            if service.args.verbose:
+                super().log_message(format, *args)
+
+    return Handler
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Deterministic local embeddings server for load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM, help="Vector size when the request has no 'dimensions'")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Base service time per request")
+    parser.add_argument("--per-item-ms", type=float, default=0.0, help="Extra service time per input text")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform random extra latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--rpm", type=float, default=0.0, help="Requests per minute before 429 (0 = unlimited)")
+    parser.add_argument("--tpm", type=float, default=0.0, help="Approximate tokens per minute before 429 (0 = unlimited)")
+    parser.add_argument("--max-inputs", type=int, default=2048, help="Maximum inputs per request")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for simulated errors and jitter")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(FakeEmbeddings(args)))
+    server.daemon_threads = True
+    print(f"Fake embeddings server on http://{args.host}:{args.port}/v1/embeddings (dim={args.dim})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,17 +6,34 @@ This script reads the Quanton3D parameters Excel file and generates a structured
 JSON database for use by the backend API and RAG system.
 
 Usage:
-    python import_print_params_from_excel.py <excel_file> [output_dir]
+    python import_print_params_from_excel.py <excel_file> [output_dir] [--mongo-export DIR] [--grouped-digest] [--stats-json FILE]
 """
 
+import argparse
 import pandas as pd
-import json
 import re
-import sys
 import os
+import sys
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 
+# Run as a file (python scripts/<name>.py) the repo root is not on sys.path;
+# add it so the sibling helpers resolve through the scripts package either way.
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scripts.entity_extractor import write_entity_automaton
+from scripts.import_stats import ImportStats, count_profiles, new_sheet_stats
+from scripts.mongo_bulk_export import DEFAULT_CHUNK_SIZE, profile_to_mongo, write_bulk_export
+from scripts.print_params_digest import (
+    DEFAULT_MAX_CHARS,
+    GROUPED_DIGEST_NAME,
+    profile_param_text,
+    write_grouped_digest,
+)
+from scripts.profile_recommender import DEFAULT_K, write_fallback_table
+
 def slugify(text: str) -> str:
     """Convert text to a URL-safe slug."""
     if not text or pd.isna(text):
@@ -77,11 +94,13 @@ def extract_resin_name(sheet_name: str) -> str:
     name = re.sub(r'^PAR[ÂA]METROS?\s+', '', sheet_name, flags=re.IGNORECASE)
     return name.strip()
 
-def parse_sheet(df: pd.DataFrame, sheet_name: str) -> List[Dict[str, Any]]:
+def parse_sheet(df: pd.DataFrame, sheet_name: str, stats: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
     """
     Parse a single sheet and extract all printer profiles.
     Returns a list of profile dictionaries.
+    Row/cell/header counters are accumulated into `stats` when given.
     """
+    stats = stats if stats is not None else new_sheet_stats(sheet_name)
     profiles = []
     resin_name = extract_resin_name(sheet_name)
     resin_id = slugify(resin_name)
@@ -136,11 +155,13 @@ def parse_sheet(df: pd.DataFrame, sheet_name: str) -> List[Dict[str, Any]]:
         return None
     
     for idx, row in df.iterrows():
+        stats["rowsScanned"] += 1
         row_values = [str(v).strip() if not pd.isna(v) else '' for v in row.values]
         first_cell = row_values[0] if row_values else ''
         
         # Check if this is a section header (e.g., "PARÂMETROS DE IMPRESSÃO CHITUBOX - RESINA PYROBLAST - ANYCUBIC")
         if 'PARÂMETROS DE IMPRESSÃO' in first_cell.upper() or 'PARAMETROS DE IMPRESSAO' in first_cell.upper():
+            stats["sectionHeaders"] += 1
             # Extract brand from section header
             parts = first_cell.split('-')
             if len(parts) >= 3:
@@ -150,6 +171,7 @@ def parse_sheet(df: pd.DataFrame, sheet_name: str) -> List[Dict[str, Any]]:
         # Check if this is a header row
         if 'MARCA IMPRESSORA' in first_cell.upper() or 'MODELO' in row_values[1].upper() if len(row_values) > 1 else False:
             header_row = idx
+            stats["headerDetections"] += 1
             column_mapping = {}
             for col_idx, col_name in enumerate(row_values):
                 mapped = map_column_name(col_name)
@@ -190,6 +212,7 @@ def parse_sheet(df: pd.DataFrame, sheet_name: str) -> List[Dict[str, Any]]:
             if param_name in ['brand', 'model']:
                 continue
             if col_idx < len(row_values):
+                stats["cellsParsed"] += 1
                 numeric, raw, status = parse_numeric_value(row_values[col_idx])
                 params[param_name] = numeric
                 raw_params[param_name] = raw
@@ -224,6 +247,7 @@ def parse_sheet(df: pd.DataFrame, sheet_name: str) -> List[Dict[str, Any]]:
         
         profiles.append(profile)
     
+    count_profiles(stats, profiles)
     return profiles
 
 def generate_rag_digest(profiles: List[Dict[str, Any]]) -> List[Dict[str, str]]:
@@ -231,32 +255,8 @@ def generate_rag_digest(profiles: List[Dict[str, Any]]) -> List[Dict[str, str]]:
     chunks = []
     
     for profile in profiles:
-        if profile["status"] == "coming_soon":
-            text = f"Resina {profile['resinName']} | Impressora {profile['brand']} {profile['model']}: Parâmetros em breve."
-        else:
-            params = profile["params"]
-            param_parts = []
-            
-            if params.get("layerHeightMm") is not None:
-                param_parts.append(f"altura de camada={params['layerHeightMm']}mm")
-            if params.get("baseLayers") is not None:
-                param_parts.append(f"camadas de base={int(params['baseLayers'])}")
-            if params.get("exposureTimeS") is not None:
-                param_parts.append(f"tempo de exposição={params['exposureTimeS']}s")
-            if params.get("baseExposureTimeS") is not None:
-                param_parts.append(f"exposição base={params['baseExposureTimeS']}s")
-            if params.get("uvOffDelayS") is not None:
-                param_parts.append(f"retardo UV={params['uvOffDelayS']}s")
-            if params.get("restBeforeLiftS") is not None:
-                param_parts.append(f"descanso antes elevação={params['restBeforeLiftS']}s")
-            if params.get("restAfterLiftS") is not None:
-                param_parts.append(f"descanso após elevação={params['restAfterLiftS']}s")
-            if params.get("restAfterRetractS") is not None:
-                param_parts.append(f"descanso após retração={params['restAfterRetractS']}s")
-            if params.get("uvPower") is not None:
-                param_parts.append(f"potência UV={params['uvPower']}")
-            
-            text = f"Resina {profile['resinName']} | Impressora {profile['brand']} {profile['model']}: {', '.join(param_parts)}"
+        # Same field list as the grouped digest (print_params_digest.PARAM_LABELS).
+        text = f"Resina {profile['resinName']} | Impressora {profile['brand']} {profile['model']}: {profile_param_text(profile)}"
         
         chunks.append({
             "id": profile["id"],
@@ -268,19 +268,31 @@ def generate_rag_digest(profiles: List[Dict[str, Any]]) -> List[Dict[str, str]]:
     
     return chunks
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Import print parameters from the Quanton3D Excel file")
+    parser.add_argument("excel_file")
+    parser.add_argument("output_dir", nargs="?", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser.add_argument("--mongo-export", help="Write bulk-load JSONL for the parametros collection to this directory")
+    parser.add_argument("--mongo-chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--fallback-k", type=int, default=DEFAULT_K, help="Nearest ok profiles stored per pair without parameters")
+    parser.add_argument("--grouped-digest", action="store_true", help=f"Also write {GROUPED_DIGEST_NAME} (one chunk per resin table)")
+    parser.add_argument("--digest-max-chars", type=int, default=DEFAULT_MAX_CHARS, help="Split grouped chunks longer than this")
+    parser.add_argument("--stats-json", help="Write per-sheet timing and volume statistics to this JSON file")
+    return parser.parse_args()
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python import_print_params_from_excel.py <excel_file> [output_dir]")
-        sys.exit(1)
-    
-    excel_file = sys.argv[1]
-    output_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    args = parse_args()
+    excel_file = args.excel_file
+    output_dir = args.output_dir
     
     print(f"Reading Excel file: {excel_file}")
     print(f"Output directory: {output_dir}")
     
+    stats = ImportStats(excel_file)
+    
     # Read all sheets
-    xl = pd.ExcelFile(excel_file)
+    with stats.timed(stats.timings, "openWorkbookSeconds"):
+        xl = pd.ExcelFile(excel_file)
     print(f"Found {len(xl.sheet_names)} sheets: {xl.sheet_names}")
     
     all_profiles = []
@@ -289,9 +301,12 @@ def main():
     
     for sheet_name in xl.sheet_names:
         print(f"\nProcessing sheet: {sheet_name}")
-        df = pd.read_excel(excel_file, sheet_name=sheet_name, header=None)
+        sheet_stats = stats.sheet(sheet_name)
+        with stats.timed(sheet_stats, "readSeconds"):
+            df = pd.read_excel(xl, sheet_name=sheet_name, header=None)
         
-        profiles = parse_sheet(df, sheet_name)
+        with stats.timed(sheet_stats, "parseSeconds"):
+            profiles = parse_sheet(df, sheet_name, sheet_stats)
         print(f"  Found {len(profiles)} profiles")
         
         # Collect unique resins and printers
@@ -343,16 +358,49 @@ def main():
     
     # Write database file
     db_file = os.path.join(data_dir, 'print-parameters-db.json')
-    with open(db_file, 'w', encoding='utf-8') as f:
-        json.dump(database, f, ensure_ascii=False, indent=2)
+    stats.dump_json(database, db_file, ensure_ascii=False, indent=2)
     print(f"\nDatabase written to: {db_file}")
     
     # Write RAG digest file
     rag_file = os.path.join(data_dir, 'print-parameters-rag.json')
-    with open(rag_file, 'w', encoding='utf-8') as f:
-        json.dump(rag_digest, f, ensure_ascii=False, indent=2)
+    stats.dump_json(rag_digest, rag_file, ensure_ascii=False, indent=2)
     print(f"RAG digest written to: {rag_file}")
     
+    if args.grouped_digest:
+        grouped_file = os.path.join(data_dir, GROUPED_DIGEST_NAME)
+        with stats.timed(stats.timings, "groupedDigestSeconds"):
+            grouped = write_grouped_digest(all_profiles, grouped_file, max_chars=args.digest_max_chars)
+        print(f"Grouped RAG digest written to: {grouped_file} ({len(rag_digest)} chunks -> {len(grouped['chunks'])})")
+    
+    # Write resin/printer entity automaton
+    automaton_file = os.path.join(data_dir, 'entity-automaton.json')
+    with stats.timed(stats.timings, "entityAutomatonSeconds"):
+        automaton = write_entity_automaton(database, automaton_file)
+    print(f"Entity automaton written to: {automaton_file} ({len(automaton['patterns'])} patterns)")
+    
+    # Write nearest-profile fallback table for pairs without parameters
+    fallback_file = os.path.join(data_dir, 'print-parameters-fallback.json')
+    with stats.timed(stats.timings, "fallbackTableSeconds"):
+        fallback = write_fallback_table(database, fallback_file, k=args.fallback_k)
+    print(f"Fallback table written to: {fallback_file} ({len(fallback['pairs'])} pairs)")
+    
+    if args.mongo_export:
+        with stats.timed(stats.timings, "mongoExportSeconds"):
+            export = write_bulk_export(
+                (profile_to_mongo(profile) for profile in all_profiles),
+                args.mongo_export,
+                collection="parametros",
+                upsert_key="id",
+                chunk_size=args.mongo_chunk_size,
+            )
+        print(f"MongoDB export written to: {args.mongo_export} ({export['documents']} profiles, {len(export['files'])} files)")
+    
+    if args.stats_json:
+        report = stats.write(args.stats_json)
+        slowest = max(report["sheets"], key=lambda sheet: sheet["parseSeconds"] + sheet["readSeconds"], default=None)
+        print(f"Import statistics written to: {args.stats_json} ({report['totalSeconds']:.2f}s total"
+              + (f", slowest sheet: {slowest['name']})" if slowest else ")"))
+    
     # Print summary
     print(f"\n=== IMPORT SUMMARY ===")
     print(f"Total Resins: {len(resins)}")
@@ -370,41 +418,7 @@ def main():
         print(f"  - {printer['brand']} {printer['model']} ({printer['id']})")
     if len(printers) > 10:
         print(f"  ... and {len(printers) - 10} more")
-    
-    # DEBUG: Print example profiles for validation
-    print("\n=== DEBUG: EXAMPLE PROFILES FOR VALIDATION ===")
-    
-    # Find IRON resin profiles with MARS or PHOTON printers
-    example_profiles = []
-    for p in all_profiles:
-        resin_lower = p['resinName'].lower()
-        model_lower = p['model'].lower()
-        # Look for IRON + MARS or IRON + PHOTON CLASSICA
-        if 'iron' in resin_lower and ('mars' in model_lower or 'photon' in model_lower):
-            example_profiles.append(p)
-    
-    # Show first 3 examples
-    for p in example_profiles[:3]:
-        print(f"\n--- {p['resinName']} + {p['brand']} {p['model']} ---")
-        print(f"  Profile ID: {p['id']}")
-        print(f"  Status: {p['status']}")
-        print(f"  Parameters:")
-        print(f"    layerHeightMm: {p['params'].get('layerHeightMm')} (raw: {p['raw'].get('layerHeightMm', '')})")
-        print(f"    baseLayers: {p['params'].get('baseLayers')} (raw: {p['raw'].get('baseLayers', '')})")
-        print(f"    exposureTimeS: {p['params'].get('exposureTimeS')} (raw: {p['raw'].get('exposureTimeS', '')})")
-        print(f"    baseExposureTimeS: {p['params'].get('baseExposureTimeS')} (raw: {p['raw'].get('baseExposureTimeS', '')})")
-        print(f"    uvOffDelayS: {p['params'].get('uvOffDelayS')} (raw: {p['raw'].get('uvOffDelayS', '')})")
-        print(f"    restBeforeLiftS: {p['params'].get('restBeforeLiftS')} (raw: {p['raw'].get('restBeforeLiftS', '')})")
-        print(f"    restAfterLiftS: {p['params'].get('restAfterLiftS')} (raw: {p['raw'].get('restAfterLiftS', '')})")
-        print(f"    restAfterRetractS: {p['params'].get('restAfterRetractS')} (raw: {p['raw'].get('restAfterRetractS', '')})")
-        print(f"    uvPower: {p['params'].get('uvPower')} (raw: {p['raw'].get('uvPower', '')})")
-    
-    if not example_profiles:
-        print("  No IRON + MARS/PHOTON profiles found for validation")
-    
-    print("\n=== VALIDATION CHECK ===")
-    print("Expected for IRON + PHOTON CLASSICA: exposureTimeS=6.5, baseExposureTimeS=55")
-    print("If these values are swapped or blank, the column mapping is still incorrect!")
+
 
 if __name__ == "__main__":
     main()
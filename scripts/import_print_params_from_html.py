@@ -3,20 +3,36 @@
 Import Print Parameters from HTML (Trio Office export) to JSON Database.
 
 Usage:
-  python scripts/import_print_params_from_html.py <html_file> [output_path]
+  python scripts/import_print_params_from_html.py <html_file> [output_path] [--stats-json FILE]
 """
 
 from __future__ import annotations
 
 import argparse
-import json
 import re
+import sys
 from datetime import datetime
 from html import unescape
 from html.parser import HTMLParser
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+# Run as a file (python scripts/<name>.py) the repo root is not on sys.path;
+# add it so the sibling helpers resolve through the scripts package either way.
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scripts.entity_extractor import write_entity_automaton
+from scripts.import_stats import ImportStats, count_profiles, new_sheet_stats
+from scripts.mongo_bulk_export import DEFAULT_CHUNK_SIZE, profile_to_mongo, write_bulk_export
+from scripts.print_params_digest import (
+    DEFAULT_MAX_CHARS,
+    GROUPED_DIGEST_NAME,
+    profile_param_text,
+    write_grouped_digest,
+)
+from scripts.profile_recommender import DEFAULT_K, write_fallback_table
+
 
 class TableHTMLParser(HTMLParser):
     def __init__(self) -> None:
@@ -265,7 +281,10 @@ def enforce_column_positions(column_mapping: Dict[int, str], total_columns: int)
         column_mapping[4] = "exposureTimeS"
 
 
-def parse_table(rows: List[List[str]], sheet_name: str) -> List[Dict[str, Any]]:
+def parse_table(
+    rows: List[List[str]], sheet_name: str, stats: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    stats = stats if stats is not None else new_sheet_stats(sheet_name, timed_read=False)
     profiles: List[Dict[str, Any]] = []
     resin_name = extract_resin_name(sheet_name)
     resin_id = slugify(resin_name)
@@ -275,10 +294,12 @@ def parse_table(rows: List[List[str]], sheet_name: str) -> List[Dict[str, Any]]:
     missing_data_index: Optional[int] = None
 
     for row in rows:
+        stats["rowsScanned"] += 1
         row_values = [cell.strip() for cell in row]
         first_cell = row_values[0] if row_values else ""
 
         if first_cell and "PARÂMETROS DE IMPRESSÃO" in first_cell.upper():
+            stats["sectionHeaders"] += 1
             parts = [part.strip() for part in first_cell.split("-") if part.strip()]
             if parts:
                 current_brand = parts[-1].strip()
@@ -290,6 +311,7 @@ def parse_table(rows: List[List[str]], sheet_name: str) -> List[Dict[str, Any]]:
             "MARCA IMPRESSORA" in first_cell.upper()
             or (len(row_values) > 1 and "MODELO" in row_values[1].upper())
         ):
+            stats["headerDetections"] += 1
             column_mapping = {}
             missing_data_index = None
             for idx, col_name in enumerate(row_values):
@@ -326,6 +348,7 @@ def parse_table(rows: List[List[str]], sheet_name: str) -> List[Dict[str, Any]]:
                 continue
             if col_idx >= len(row_values):
                 continue
+            stats["cellsParsed"] += 1
             numeric, raw, _status = parse_numeric_value(row_values[col_idx])
             if param_name == "baseLayers" and numeric is not None:
                 numeric = int(round(numeric))
@@ -355,6 +378,7 @@ def parse_table(rows: List[List[str]], sheet_name: str) -> List[Dict[str, Any]]:
             }
         )
 
+    count_profiles(stats, profiles)
     return profiles
 
 
@@ -402,37 +426,8 @@ def generate_rag_digest(profiles: List[Dict[str, Any]]) -> List[Dict[str, str]]:
     chunks = []
 
     for profile in profiles:
-        if profile["status"] == "coming_soon":
-            text = f"Resina {profile['resinName']} | Impressora {profile['brand']} {profile['model']}: Parâmetros em breve."
-        else:
-            params = profile.get("params", {})
-            param_parts = []
-
-            if params.get("layerHeightMm") is not None:
-                param_parts.append(f"altura de camada={params['layerHeightMm']}mm")
-            if params.get("baseLayers") is not None:
-                param_parts.append(f"camadas de base={int(params['baseLayers'])}")
-            if params.get("exposureTimeS") is not None:
-                param_parts.append(f"tempo de exposição={params['exposureTimeS']}s")
-            if params.get("baseExposureTimeS") is not None:
-                param_parts.append(f"exposição base={params['baseExposureTimeS']}s")
-            if params.get("uvOffDelayS") is not None:
-                param_parts.append(f"retardo UV={params['uvOffDelayS']}s")
-            if params.get("uvOffDelayBaseS") is not None:
-                param_parts.append(f"retardo UV base={params['uvOffDelayBaseS']}s")
-            if params.get("restBeforeLiftS") is not None:
-                param_parts.append(f"descanso antes elevação={params['restBeforeLiftS']}s")
-            if params.get("restAfterLiftS") is not None:
-                param_parts.append(f"descanso após elevação={params['restAfterLiftS']}s")
-            if params.get("restAfterRetractS") is not None:
-                param_parts.append(f"descanso após retração={params['restAfterRetractS']}s")
-            if params.get("uvPower") is not None:
-                param_parts.append(f"potência UV={params['uvPower']}")
-
-            text = (
-                f"Resina {profile['resinName']} | Impressora {profile['brand']} {profile['model']}: "
-                f"{', '.join(param_parts)}"
-            )
+        # Same field list as the grouped digest (print_params_digest.PARAM_LABELS).
+        text = f"Resina {profile['resinName']} | Impressora {profile['brand']} {profile['model']}: {profile_param_text(profile)}"
 
         chunks.append(
             {
@@ -456,17 +451,26 @@ def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("html_file", type=Path)
     parser.add_argument("output_path", type=Path, nargs="?", default=Path("data/resins_extracted.json"))
+    parser.add_argument("--mongo-export", type=Path, help="Grava JSONL pronto para bulk load na coleção parametros")
+    parser.add_argument("--mongo-chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--fallback-k", type=int, default=DEFAULT_K, help="Perfis ok mais próximos guardados por par sem parâmetros")
+    parser.add_argument("--grouped-digest", action="store_true", help=f"Grava também {GROUPED_DIGEST_NAME} (um chunk por tabela de resina)")
+    parser.add_argument("--digest-max-chars", type=int, default=DEFAULT_MAX_CHARS, help="Divide chunks agrupados maiores que isso")
+    parser.add_argument("--stats-json", type=Path, help="Grava tempos e volumes por tabela neste JSON")
     args = parser.parse_args()
 
-    html_bytes = args.html_file.read_bytes()
-    try:
-        html_text = html_bytes.decode("utf-8")
-    except UnicodeDecodeError:
-        html_text = html_bytes.decode("latin1")
+    stats = ImportStats(str(args.html_file))
+    with stats.timed(stats.timings, "readSeconds"):
+        html_bytes = args.html_file.read_bytes()
+        try:
+            html_text = html_bytes.decode("utf-8")
+        except UnicodeDecodeError:
+            html_text = html_bytes.decode("latin1")
     sheet_names = extract_sheet_names(html_text)
 
     table_parser = TableHTMLParser()
-    table_parser.feed(html_text)
+    with stats.timed(stats.timings, "htmlParseSeconds"):
+        table_parser.feed(html_text)
 
     tables = table_parser.tables
     if sheet_names and len(sheet_names) != len(tables):
@@ -481,20 +485,58 @@ def main() -> None:
 
     for idx in range(count):
         sheet_name = used_sheet_names[idx] if used_sheet_names else f"Planilha {idx + 1}"
-        profiles.extend(parse_table(tables[idx], sheet_name))
+        # The whole file is read once (timings["readSeconds"]); tables only have a parse time.
+        sheet_stats = stats.sheet(sheet_name, timed_read=False)
+        with stats.timed(sheet_stats, "parseSeconds"):
+            profiles.extend(parse_table(tables[idx], sheet_name, sheet_stats))
 
     output = build_output(used_sheet_names if used_sheet_names else [f"Planilha {i+1}" for i in range(count)], profiles)
     args.output_path.parent.mkdir(parents=True, exist_ok=True)
-    args.output_path.write_text(json.dumps(output, ensure_ascii=False, indent=2), encoding="utf-8")
+    stats.dump_json(output, args.output_path, ensure_ascii=False, indent=2)
     print(f"✅ Gerado {args.output_path} com {len(profiles)} perfis.")
 
     rag_output = generate_rag_digest(profiles)
     db_path = args.output_path.parent / "print-parameters-db.json"
     rag_path = args.output_path.parent / "print-parameters-rag.json"
-    db_path.write_text(json.dumps(output, ensure_ascii=False, indent=2), encoding="utf-8")
-    rag_path.write_text(json.dumps(rag_output, ensure_ascii=False, indent=2), encoding="utf-8")
+    stats.dump_json(output, db_path, ensure_ascii=False, indent=2)
+    stats.dump_json(rag_output, rag_path, ensure_ascii=False, indent=2)
     print(f"✅ Gerado {db_path} e {rag_path}.")
 
+    if args.grouped_digest:
+        grouped_path = args.output_path.parent / GROUPED_DIGEST_NAME
+        with stats.timed(stats.timings, "groupedDigestSeconds"):
+            grouped = write_grouped_digest(profiles, grouped_path, max_chars=args.digest_max_chars)
+        print(f"✅ Gerado {grouped_path}: {len(rag_output)} chunks → {len(grouped['chunks'])} agrupados por resina.")
+
+    automaton_path = args.output_path.parent / "entity-automaton.json"
+    with stats.timed(stats.timings, "entityAutomatonSeconds"):
+        automaton = write_entity_automaton(output, automaton_path)
+    print(f"✅ Gerado {automaton_path} com {len(automaton['patterns'])} padrões de resinas/impressoras.")
+
+    fallback_path = args.output_path.parent / "print-parameters-fallback.json"
+    with stats.timed(stats.timings, "fallbackTableSeconds"):
+        fallback = write_fallback_table(output, fallback_path, k=args.fallback_k)
+    print(f"✅ Gerado {fallback_path} com sugestões para {len(fallback['pairs'])} pares sem parâmetros.")
+
+    if args.mongo_export:
+        with stats.timed(stats.timings, "mongoExportSeconds"):
+            export = write_bulk_export(
+                (profile_to_mongo(profile) for profile in profiles),
+                args.mongo_export,
+                collection="parametros",
+                upsert_key="id",
+                chunk_size=args.mongo_chunk_size,
+            )
+        print(f"✅ Export MongoDB: {export['documents']} perfis em {len(export['files'])} arquivos ({args.mongo_export}).")
+
+    if args.stats_json:
+        report = stats.write(args.stats_json)
+        totals = report["totals"]
+        print(
+            f"📊 Estatísticas em {args.stats_json}: {totals['rowsScanned']} linhas, {totals['cellsParsed']} células, "
+            f"{report['totalSeconds']:.2f}s no total."
+        )
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Run statistics for the print-parameter importers (--stats-json).
+
+parse_sheet / parse_table take an optional per-sheet stats dict (see
+new_sheet_stats) and bump its counters while scanning; ImportStats adds the
+timings around reading, parsing and JSON serialization and writes one report:
+
+  {
+    "source": "...xlsx", "totalSeconds": 1.92,
+    "sheets": [{"name", "readSeconds", "parseSeconds", "rowsScanned", "cellsParsed",
+                "headerDetections", "sectionHeaders", "profiles", "profilesByStatus"}],
+    "timings": {...whole-file steps, e.g. the HTML read, which has no per-sheet readSeconds...},
+    "totals": {...same counters summed...},
+    "serialization": {"print-parameters-db.json": {"serializeSeconds", "writeSeconds", "bytes"}}
+  }
+
+Comparing reports across runs shows spreadsheet growth and which sheets are slow.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List
+
+COUNTERS = ("rowsScanned", "cellsParsed", "headerDetections", "sectionHeaders", "profiles")
+
+
+def new_sheet_stats(name: str, timed_read: bool = True) -> Dict[str, Any]:
+    """timed_read=False for sources read as a whole (HTML), where a per-sheet read time does not exist."""
+    stats: Dict[str, Any] = {"name": name, "parseSeconds": 0.0}
+    if timed_read:
+        stats["readSeconds"] = 0.0
+    stats.update({counter: 0 for counter in COUNTERS})
+    stats["profilesByStatus"] = {}
+    return stats
+
+
+def count_profiles(stats: Dict[str, Any], profiles: List[Dict[str, Any]]) -> None:
+    stats["profiles"] += len(profiles)
+    for profile in profiles:
+        status = profile.get("status") or "unknown"
+        stats["profilesByStatus"][status] = stats["profilesByStatus"].get(status, 0) + 1
+
+
+class ImportStats:
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.started = time.perf_counter()
+        self.sheets: List[Dict[str, Any]] = []
+        self.timings: Dict[str, float] = {}
+        self.serialization: Dict[str, Dict[str, Any]] = {}
+
+    def sheet(self, name: str, timed_read: bool = True) -> Dict[str, Any]:
+        stats = new_sheet_stats(name, timed_read)
+        self.sheets.append(stats)
+        return stats
+
+    @contextmanager
+    def timed(self, target: Dict[str, Any], key: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            target[key] = target.get(key, 0.0) + time.perf_counter() - started
+
+    def dump_json(self, data: Any, path: str, **json_kwargs: Any) -> None:
+        """json.dump replacement that records serialization and write time per output file."""
+        started = time.perf_counter()
+        text = json.dumps(data, **json_kwargs)
+        serialized = time.perf_counter()
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(text)
+        self.serialization[os.path.basename(str(path))] = {
+            "serializeSeconds": round(serialized - started, 6),
+            "writeSeconds": round(time.perf_counter() - serialized, 6),
+            "bytes": len(text.encode("utf-8")),
+        }
+
+    def report(self) -> Dict[str, Any]:
+        totals: Dict[str, Any] = {counter: sum(sheet[counter] for sheet in self.sheets) for counter in COUNTERS}
+        if any("readSeconds" in sheet for sheet in self.sheets):
+            totals["readSeconds"] = round(sum(sheet.get("readSeconds", 0.0) for sheet in self.sheets), 6)
+        totals["parseSeconds"] = round(sum(sheet["parseSeconds"] for sheet in self.sheets), 6)
+        by_status: Dict[str, int] = {}
+        for sheet in self.sheets:
+            for status, count in sheet["profilesByStatus"].items():
+                by_status[status] = by_status.get(status, 0) + count
+        totals["profilesByStatus"] = by_status
+
+        sheets = [
+            {**sheet, **{key: round(sheet[key], 6) for key in ("readSeconds", "parseSeconds") if key in sheet}}
+            for sheet in self.sheets
+        ]
+        return {
+            "source": self.source,
+            "generatedAt": datetime.utcnow().isoformat() + "Z",
+            "totalSeconds": round(time.perf_counter() - self.started, 6),
+            "timings": {name: round(seconds, 6) for name, seconds in self.timings.items()},
+            "sheets": sheets,
+            "totals": totals,
+            "serialization": self.serialization,
+        }
+
+    def write(self, path: str) -> Dict[str, Any]:
+        report = self.report()
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, ensure_ascii=False, indent=2)
+        return report
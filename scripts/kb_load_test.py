@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Load generator for kb_service.py.
+
+Opens N keep-alive connections, fires random query vectors at POST /search and
+reports throughput plus latency percentiles. Runs fully offline.
+
+Usage:
+  python kb_service.py --synthetic-docs 20000 --synthetic-dim 3072 &
+  python scripts/kb_load_test.py --concurrency 64 --requests 5000
+  python scripts/kb_load_test.py --unix /tmp/kb.sock --concurrency 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host: str, port: int, unix: Optional[str]) -> "Connection":
+        if unix:
+            reader, writer = await asyncio.open_unix_connection(unix)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, method: str, path: str, payload: Optional[dict] = None) -> Tuple[int, dict]:
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        head = (
+            f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+        )
+        self.writer.write(head.encode("latin1") + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        status = int(status_line.split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value.strip())
+        data = await self.reader.readexactly(length) if length else b"{}"
+        return status, json.loads(data)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+async def worker(
+    conn: Connection, dim: int, top_k: int, queue: "asyncio.Queue[int]", latencies: List[float], errors: Dict[int, int]
+) -> None:
+    rng = random.Random()
+    while True:
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        vector = [rng.gauss(0.0, 1.0) for _ in range(dim)]
+        started = time.perf_counter()
+        status, _ = await conn.request("POST", "/search", {"vector": vector, "top_k": top_k})
+        latencies.append(time.perf_counter() - started)
+        if status != 200:
+            errors[status] = errors.get(status, 0) + 1
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run(args: argparse.Namespace) -> dict:
+    probe = await Connection.open(args.host, args.port, args.unix)
+    _, health = await probe.request("GET", "/health")
+    dim = health["dimensions"]
+
+    connections = [probe] + [
+        await Connection.open(args.host, args.port, args.unix) for _ in range(args.concurrency - 1)
+    ]
+    queue: "asyncio.Queue[int]" = asyncio.Queue()
+    for idx in range(args.requests):
+        queue.put_nowait(idx)
+
+    latencies: List[float] = []
+    errors: Dict[int, int] = {}
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(conn, dim, args.top_k, queue, latencies, errors) for conn in connections))
+    elapsed = time.perf_counter() - started
+
+    _, health = await probe.request("GET", "/health")
+    for conn in connections:
+        conn.close()
+
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "concurrency": args.concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(ordered) * 1000, 2) if ordered else 0.0,
+            "p50": round(percentile(ordered, 50) * 1000, 2),
+            "p95": round(percentile(ordered, 95) * 1000, 2),
+            "p99": round(percentile(ordered, 99) * 1000, 2),
+            "max": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        },
+        "errors": errors,
+        "server_batching": health.get("batching"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load generator for kb_service.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Unix socket path (instead of TCP)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Bulk-load export for MongoDB.
+
+kb_build.py and the print-parameter importers can write their output as
+ready-to-load JSONL in relaxed Extended JSON (dates as {"$date": ...}). Each
+document already carries its tags, a content hash and the upsert key, and the
+files are split into bulk-write-sized chunks. Seeding is then one bulkWrite per
+file (or `mongoimport --mode=upsert --upsertFields=<key>` per file) instead of
+a per-document loop.
+
+Usage:
+  python scripts/mongo_bulk_export.py <export_dir> --verify
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+MANIFEST_NAME = "manifest.json"
+DEFAULT_CHUNK_SIZE = 1000
+
+# Same rules as scripts/import-kb-with-tags.js, so both paths produce identical tags.
+TAG_RULES = [
+    ("resina", ["resina", "resin", "spin", "alchemist", "spark", "iron", "vulcancast", "flexform", "pyroblast"]),
+    ("impressora", ["impressora", "printer", "lcd", "sla", "dlp", "photon", "mars", "saturn", "kobra", "ender"]),
+    ("parametros", ["exposi", "layer", "camada", "uv", "cura", "lift", "speed", "velocidade", "base"]),
+    ("manutencao", ["limpar", "limpeza", "trocar", "fep", "lcd", "display", "tela", "nivel"]),
+    ("problemas", ["erro", "falha", "defeito", "bolha", "mancha", "vaza", "quebrar", "suc", "ghost", "bleed"]),
+    ("seguranca", ["mascara", "luva", "cheiro", "odor", "seguranca", "toxico"]),
+]
+
+
+def build_tags(doc: Dict[str, Any]) -> List[str]:
+    haystack = f"{doc.get('title')}\n{doc.get('content')}".lower()
+    tags = {tag for tag, keywords in TAG_RULES if any(keyword in haystack for keyword in keywords)}
+
+    source = doc.get("source")
+    if source:
+        base_source = os.path.basename(os.path.dirname(str(source)))
+        if base_source:
+            tags.add(base_source)
+
+    if not tags:
+        tags.add("geral")
+
+    tags.add("kb-index")
+    return sorted(tags)
+
+
+def content_hash(value: Any) -> str:
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def kb_document_to_mongo(doc: Dict[str, Any], model_name: str) -> Dict[str, Any]:
+    """Mirror of toMongoDocument() in scripts/import-kb-with-tags.js."""
+    return {
+        "legacyId": doc["id"],
+        "title": doc.get("title") or doc["id"],
+        "content": doc.get("content"),
+        "source": doc.get("source") or "kb-index",
+        "category": doc.get("category"),
+        "tags": build_tags(doc),
+        "contentHash": doc.get("content_hash") or content_hash(f"{doc.get('title')}\n{doc.get('content')}"),
+        "embedding": doc.get("embedding") or [],
+        "embeddingModel": doc.get("embedding_model") or model_name,
+    }
+
+
+def profile_to_mongo(profile: Dict[str, Any]) -> Dict[str, Any]:
+    tags = ["parametros", profile.get("resinId"), profile.get("printerId", "").split("__", 1)[0], profile.get("status")]
+    return {
+        **profile,
+        "tags": sorted({tag for tag in tags if tag}),
+        "contentHash": content_hash({"params": profile.get("params"), "status": profile.get("status")}),
+    }
+
+
+def to_extended_json(value: Any) -> Any:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return {"$date": value.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")}
+    if isinstance(value, dict):
+        return {key: to_extended_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_extended_json(item) for item in value]
+    return value
+
+
+def from_extended_json(value: Any) -> Any:
+    if isinstance(value, dict):
+        if set(value) == {"$date"}:
+            return datetime.fromisoformat(str(value["$date"]).replace("Z", "+00:00"))
+        return {key: from_extended_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [from_extended_json(item) for item in value]
+    return value
+
+
+def previous_versions(export_dir: Path, collection: str, upsert_key: str) -> Dict[Any, Tuple[Any, Any]]:
+    """upsert key -> (contentHash, updatedAt) from the chunks a previous run left in export_dir."""
+    versions: Dict[Any, Tuple[Any, Any]] = {}
+    for chunk_file in sorted(Path(export_dir).glob(f"{collection}-*.jsonl")):
+        with open(chunk_file, encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                document = json.loads(line)
+                if document.get(upsert_key) is not None:
+                    versions[document[upsert_key]] = (document.get("contentHash"), document.get("updatedAt"))
+    return versions
+
+
+def write_bulk_export(
+    records: Iterable[Dict[str, Any]],
+    export_dir: Path,
+    collection: str,
+    upsert_key: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """Write records as <collection>-NNNN.jsonl chunks plus a manifest.
+
+    Records whose contentHash matches the previous export keep its updatedAt, so
+    reloading an unchanged record is a no-op $set instead of a write.
+    """
+    export_dir = Path(export_dir)
+    export_dir.mkdir(parents=True, exist_ok=True)
+    previous = previous_versions(export_dir, collection, upsert_key)
+    for old_file in export_dir.glob(f"{collection}-*.jsonl"):
+        old_file.unlink()
+
+    updated_at = datetime.now(timezone.utc)
+    files: List[Dict[str, Any]] = []
+    seen_keys = set()
+    unchanged = 0
+    buffer: List[str] = []
+
+    def flush() -> None:
+        if not buffer:
+            return
+        file_name = f"{collection}-{len(files) + 1:04d}.jsonl"
+        (export_dir / file_name).write_text("\n".join(buffer) + "\n", encoding="utf-8")
+        files.append({"file": file_name, "documents": len(buffer)})
+        buffer.clear()
+
+    for record in records:
+        key = record.get(upsert_key)
+        if key is None:
+            raise ValueError(f"Document without upsert key '{upsert_key}': {record}")
+        if key in seen_keys:
+            raise ValueError(f"Duplicate upsert key '{upsert_key}'={key!r} in {collection} export")
+        seen_keys.add(key)
+        document = to_extended_json({**record, "updatedAt": updated_at})
+        previous_hash, previous_updated_at = previous.get(key, (None, None))
+        if previous_updated_at and previous_hash is not None and previous_hash == record.get("contentHash"):
+            document["updatedAt"] = previous_updated_at
+            unchanged += 1
+        buffer.append(json.dumps(document, ensure_ascii=False, separators=(",", ":")))
+        if len(buffer) >= chunk_size:
+            flush()
+    flush()
+
+    manifest_path = export_dir / MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8")) if manifest_path.exists() else {}
+    manifest[collection] = {
+        "upsertKey": upsert_key,
+        "chunkSize": chunk_size,
+        "documents": len(seen_keys),
+        "unchanged": unchanged,
+        "files": files,
+    }
+    manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return manifest[collection]
+
+
+def iter_bulk_operations(export_dir: Path) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """Yield (collection, operations) per chunk, in the updateOne/upsert shape the Node scripts use."""
+    export_dir = Path(export_dir)
+    manifest = json.loads((export_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    for collection, entry in manifest.items():
+        key = entry["upsertKey"]
+        for chunk in entry["files"]:
+            operations = []
+            with open(export_dir / chunk["file"], encoding="utf-8") as handle:
+                for line in handle:
+                    if not line.strip():
+                        continue
+                    document = from_extended_json(json.loads(line))
+                    operations.append(
+                        {
+                            "updateOne": {
+                                "filter": {key: document[key]},
+                                "update": {"$set": document, "$setOnInsert": {"createdAt": document["updatedAt"]}},
+                                "upsert": True,
+                            }
+                        }
+                    )
+            yield collection, operations
+
+
+class MemoryCollection:
+    """In-memory stand-in for a MongoDB collection (bulk_write with updateOne upserts only)."""
+
+    def __init__(self) -> None:
+        self.documents: List[Dict[str, Any]] = []
+        self.bulk_calls = 0
+
+    def _find(self, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        for document in self.documents:
+            if all(document.get(field) == value for field, value in query.items()):
+                return document
+        return None
+
+    def bulk_write(self, operations: List[Dict[str, Any]], ordered: bool = False) -> Dict[str, int]:
+        self.bulk_calls += 1
+        result = {"matchedCount": 0, "modifiedCount": 0, "upsertedCount": 0}
+        for operation in operations:
+            spec = operation["updateOne"]
+            update = spec["update"]
+            document = self._find(spec["filter"])
+            if document is None:
+                if not spec.get("upsert"):
+                    continue
+                document = {**copy.deepcopy(spec["filter"]), **copy.deepcopy(update.get("$setOnInsert", {}))}
+                document.update(copy.deepcopy(update.get("$set", {})))
+                self.documents.append(document)
+                result["upsertedCount"] += 1
+                continue
+            result["matchedCount"] += 1
+            changes = {
+                field: value for field, value in update.get("$set", {}).items() if document.get(field) != value
+            }
+            if changes:
+                document.update(copy.deepcopy(changes))
+                result["modifiedCount"] += 1
+        return result
+
+    def count_documents(self, query: Optional[Dict[str, Any]] = None) -> int:
+        if not query:
+            return len(self.documents)
+        return sum(1 for document in self.documents if all(document.get(k) == v for k, v in query.items()))
+
+
+def load_into(collections: Dict[str, Any], export_dir: Path) -> Dict[str, Dict[str, int]]:
+    """Apply an export to collection-like objects exposing bulk_write(operations)."""
+    summary: Dict[str, Dict[str, int]] = {}
+    for collection, operations in iter_bulk_operations(export_dir):
+        result = collections[collection].bulk_write(operations, ordered=False)
+        totals = summary.setdefault(
+            collection, {"operations": 0, "bulkWrites": 0, "upserted": 0, "matched": 0, "modified": 0}
+        )
+        totals["operations"] += len(operations)
+        totals["bulkWrites"] += 1
+        totals["upserted"] += result["upsertedCount"]
+        totals["matched"] += result["matchedCount"]
+        totals["modified"] += result["modifiedCount"]
+    return summary
+
+
+def verify_export(export_dir: Path) -> Dict[str, Any]:
+    """Load the export twice into memory: first pass must insert everything, second pass nothing."""
+    manifest = json.loads((Path(export_dir) / MANIFEST_NAME).read_text(encoding="utf-8"))
+    collections = {name: MemoryCollection() for name in manifest}
+    first = load_into(collections, export_dir)
+    second = load_into(collections, export_dir)
+    report: Dict[str, Any] = {}
+    for name, entry in manifest.items():
+        report[name] = {
+            "expected": entry["documents"],
+            "stored": collections[name].count_documents(),
+            "bulkWrites": first[name]["bulkWrites"] if name in first else 0,
+            "firstPassUpserted": first.get(name, {}).get("upserted", 0),
+            "secondPassUpserted": second.get(name, {}).get("upserted", 0),
+        }
+        report[name]["ok"] = (
+            report[name]["stored"] == entry["documents"] == report[name]["firstPassUpserted"]
+            and report[name]["secondPassUpserted"] == 0
+        )
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect/verify a MongoDB bulk-load export")
+    parser.add_argument("export_dir", type=Path)
+    parser.add_argument("--verify", action="store_true", help="Load into an in-memory collection and check upserts")
+    args = parser.parse_args()
+
+    if args.verify:
+        report = verify_export(args.export_dir)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        if not all(entry["ok"] for entry in report.values()):
+            raise SystemExit(1)
+    else:
+        print((args.export_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+
+
+if __name__ == "__main__":
+    main()
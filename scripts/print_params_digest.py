@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Grouped RAG digest for print parameters.
+
+The per-profile digest (print-parameters-rag.json) has one chunk per resin x
+printer pair, so most chunks are the same "Parâmetros em breve." line or repeat
+identical parameters for printers of the same family. The grouped digest emits
+one chunk per resin table instead: printers that share exactly the same
+parameter text are collapsed onto one line, and all pairs without parameters
+share a single line. Very large tables are split into numbered parts.
+
+A `profileToChunk` map keeps exact lookups possible: the chatbot can still go
+from a profile id (`<resinId>__<printerId>`) straight to the chunk holding it.
+
+Usage:
+  python scripts/print_params_digest.py <print-parameters-db.json> [output.json] [--max-chars 4000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List
+
+GROUPED_DIGEST_NAME = "print-parameters-rag-grouped.json"
+DEFAULT_MAX_CHARS = 4000
+COMING_SOON_TEXT = "Parâmetros em breve."
+
+# (param key, label, unit, cast) in the order the chatbot has always shown them.
+PARAM_LABELS = [
+    ("layerHeightMm", "altura de camada", "mm", None),
+    ("baseLayers", "camadas de base", "", int),
+    ("exposureTimeS", "tempo de exposição", "s", None),
+    ("baseExposureTimeS", "exposição base", "s", None),
+    ("uvOffDelayS", "retardo UV", "s", None),
+    ("uvOffDelayBaseS", "retardo UV base", "s", None),
+    ("restBeforeLiftS", "descanso antes elevação", "s", None),
+    ("restAfterLiftS", "descanso após elevação", "s", None),
+    ("restAfterRetractS", "descanso após retração", "s", None),
+    ("uvPower", "potência UV", "", None),
+]
+
+
+def format_params(params: Dict[str, Any]) -> str:
+    """Parameter list as written in the digest, e.g. `altura de camada=0.05mm, ...`."""
+    parts = []
+    for key, label, unit, cast in PARAM_LABELS:
+        value = params.get(key)
+        if value is not None:
+            parts.append(f"{label}={cast(value) if cast else value}{unit}")
+    return ", ".join(parts)
+
+
+def profile_param_text(profile: Dict[str, Any]) -> str:
+    if profile["status"] == "coming_soon":
+        return COMING_SOON_TEXT
+    return format_params(profile.get("params") or {})
+
+
+def _resin_key(profile: Dict[str, Any]) -> str:
+    return profile.get("resinId") or profile["resinName"]
+
+
+def generate_grouped_digest(
+    profiles: List[Dict[str, Any]], max_chars: int = DEFAULT_MAX_CHARS
+) -> Dict[str, Any]:
+    resins: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    for profile in profiles:
+        resin = resins.setdefault(
+            _resin_key(profile), {"name": profile["resinName"], "rows": OrderedDict()}
+        )
+        text = profile_param_text(profile)
+        row = resin["rows"].setdefault(text, {"printers": [], "profileIds": [], "status": profile["status"]})
+        row["printers"].append(f"{profile['brand']} {profile['model']}".strip())
+        row["profileIds"].append(profile["id"])
+
+    chunks: List[Dict[str, Any]] = []
+    profile_to_chunk: Dict[str, str] = {}
+
+    for resin_id, resin in resins.items():
+        # Profiles with parameters first; the shared "em breve" line goes last.
+        rows = sorted(resin["rows"].items(), key=lambda item: item[0] == COMING_SOON_TEXT)
+        header = f"Resina {resin['name']} | Parâmetros por impressora:"
+
+        parts: List[List[Any]] = [[]]
+        size = len(header)
+        for text, row in rows:
+            line = f"- {', '.join(row['printers'])}: {text}"
+            if parts[-1] and size + len(line) + 1 > max_chars:
+                parts.append([])
+                size = len(header)
+            parts[-1].append((line, row))
+            size += len(line) + 1
+
+        for number, part in enumerate(parts, start=1):
+            chunk_id = resin_id if len(parts) == 1 else f"{resin_id}__parte{number}"
+            part_rows = [row for _, row in part]
+            profile_ids = [profile_id for row in part_rows for profile_id in row["profileIds"]]
+            chunks.append(
+                {
+                    "id": chunk_id,
+                    "resin": resin["name"],
+                    "printer": "",
+                    "text": "\n".join([header] + [line for line, _ in part]),
+                    "status": "ok" if any(row["status"] == "ok" for row in part_rows) else "coming_soon",
+                    "printers": len(profile_ids),
+                    "profileIds": profile_ids,
+                }
+            )
+            profile_to_chunk.update({profile_id: chunk_id for profile_id in profile_ids})
+
+    return {
+        "grouped": True,
+        "stats": {"profiles": len(profiles), "chunks": len(chunks)},
+        "chunks": chunks,
+        "profileToChunk": profile_to_chunk,
+    }
+
+
+def write_grouped_digest(
+    profiles: List[Dict[str, Any]], path: Path, max_chars: int = DEFAULT_MAX_CHARS
+) -> Dict[str, Any]:
+    digest = generate_grouped_digest(profiles, max_chars=max_chars)
+    Path(path).write_text(json.dumps(digest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return digest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the grouped print-parameter RAG digest")
+    parser.add_argument("database", type=Path, help="print-parameters-db.json written by an importer")
+    parser.add_argument("output", type=Path, nargs="?", help=f"Defaults to {GROUPED_DIGEST_NAME} next to the database")
+    parser.add_argument("--max-chars", type=int, default=DEFAULT_MAX_CHARS, help="Split resin tables longer than this")
+    args = parser.parse_args()
+
+    database = json.loads(args.database.read_text(encoding="utf-8"))
+    output = args.output or args.database.parent / GROUPED_DIGEST_NAME
+    digest = write_grouped_digest(database["profiles"], output, max_chars=args.max_chars)
+    print(f"Grouped digest written to: {output} ({digest['stats']['profiles']} profiles -> {digest['stats']['chunks']} chunks)")
+
+
+if __name__ == "__main__":
+    main()
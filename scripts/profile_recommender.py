@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Precomputed nearest-profile fallback for resin x printer pairs without parameters.
+
+Every `ok` profile becomes a feature row: its standardized print parameters plus
+printer attributes (brand one-hot). For each resin x printer pair that has no `ok`
+profile (status `coming_soon` or simply absent from the spreadsheet) the expected
+parameters are estimated additively from the resin's and the printer's average
+deviation, and the K closest `ok` profiles are found with one vectorized
+distance computation. `ok` profiles of the same resin always rank ahead of other
+resins' profiles (whose exposure settings only transfer loosely); each suggestion
+carries `sameResin` so the bot can caveat cross-resin ones. The result is a lookup
+table keyed like profile ids (`<resinId>__<printerId>`), so a fallback suggestion
+is a single dict read.
+
+Usage:
+  python scripts/profile_recommender.py <print-parameters-db.json> [resinId] [printerId] [--k 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+FEATURE_PARAMS = [
+    "exposureTimeS",
+    "baseExposureTimeS",
+    "layerHeightMm",
+    "restBeforeLiftS",
+    "restAfterLiftS",
+    "restAfterRetractS",
+    "uvPower",
+]
+BRAND_WEIGHT = 1.0
+DEFAULT_K = 3
+
+
+def _param_matrix(profiles: List[Dict[str, Any]]) -> np.ndarray:
+    values = [
+        [np.nan if profile["params"].get(name) is None else float(profile["params"][name]) for name in FEATURE_PARAMS]
+        for profile in profiles
+    ]
+    return np.asarray(values, dtype=np.float64).reshape(len(profiles), len(FEATURE_PARAMS))
+
+
+def _group_means(z: np.ndarray, keys: List[str]) -> Dict[str, np.ndarray]:
+    means: Dict[str, np.ndarray] = {}
+    for key in set(keys):
+        rows = [idx for idx, value in enumerate(keys) if value == key]
+        means[key] = z[rows].mean(axis=0)
+    return means
+
+
+def build_fallback_table(database: Dict[str, Any], k: int = DEFAULT_K) -> Dict[str, Any]:
+    profiles = database.get("profiles", [])
+    ok_profiles = [profile for profile in profiles if profile.get("status") == "ok"]
+
+    resin_ids = sorted({r["id"] for r in database.get("resins", [])} | {p["resinId"] for p in profiles})
+    printers = {p["id"]: p for p in database.get("printers", [])}
+    for profile in profiles:
+        printers.setdefault(profile["printerId"], {"id": profile["printerId"], "brand": profile["brand"]})
+    printer_ids = sorted(printers)
+
+    table: Dict[str, Any] = {
+        "version": 1,
+        "generatedAt": datetime.utcnow().isoformat() + "Z",
+        "k": k,
+        "features": FEATURE_PARAMS + ["brand"],
+        "pairs": {},
+    }
+    if not ok_profiles:
+        return table
+
+    # Standardize over ok profiles; missing values end up at the column mean (z = 0).
+    raw = _param_matrix(ok_profiles)
+    present = ~np.isnan(raw)
+    counts = np.maximum(present.sum(axis=0), 1)
+    filled = np.where(present, raw, 0.0)
+    mean = filled.sum(axis=0) / counts
+    std = np.sqrt(np.where(present, (raw - mean) ** 2, 0.0).sum(axis=0) / counts)
+    std[std == 0] = 1.0
+    z = np.where(present, (filled - mean) / std, 0.0)
+
+    brands = sorted({str(printer.get("brand", "")).upper() for printer in printers.values()})
+    brand_index = {brand: idx for idx, brand in enumerate(brands)}
+
+    def brand_vector(printer_id: str) -> np.ndarray:
+        vector = np.zeros(len(brands))
+        vector[brand_index[str(printers[printer_id].get("brand", "")).upper()]] = BRAND_WEIGHT
+        return vector
+
+    ok_features = np.hstack([z, np.vstack([brand_vector(p["printerId"]) for p in ok_profiles])])
+
+    resin_effect = _group_means(z, [p["resinId"] for p in ok_profiles])
+    printer_effect = _group_means(z, [p["printerId"] for p in ok_profiles])
+    zero = np.zeros(len(FEATURE_PARAMS))
+
+    covered = {p["id"] for p in ok_profiles}
+    missing = [
+        (resin_id, printer_id)
+        for resin_id in resin_ids
+        for printer_id in printer_ids
+        if f"{resin_id}__{printer_id}" not in covered
+    ]
+    if not missing:
+        return table
+
+    queries = np.vstack(
+        [
+            np.concatenate(
+                [resin_effect.get(resin_id, zero) + printer_effect.get(printer_id, zero), brand_vector(printer_id)]
+            )
+            for resin_id, printer_id in missing
+        ]
+    )
+
+    # ||q - x||^2 = ||q||^2 + ||x||^2 - 2 q.x, for all pairs at once
+    distances = (
+        np.sum(queries**2, axis=1)[:, None] + np.sum(ok_features**2, axis=1)[None, :] - 2.0 * queries @ ok_features.T
+    )
+    np.maximum(distances, 0.0, out=distances)
+
+    # Same-resin profiles first: other resins are pushed past the largest distance.
+    ok_resins = np.array([p["resinId"] for p in ok_profiles])
+    same_resin = np.array([resin_id for resin_id, _ in missing])[:, None] == ok_resins[None, :]
+    ranked = np.where(same_resin, distances, distances + distances.max() + 1.0)
+
+    k = min(k, len(ok_profiles))
+    nearest = np.argpartition(ranked, k - 1, axis=1)[:, :k]
+    order = np.argsort(np.take_along_axis(ranked, nearest, axis=1), axis=1)
+    nearest = np.take_along_axis(nearest, order, axis=1)
+    nearest_dist = np.sqrt(np.take_along_axis(distances, nearest, axis=1))
+
+    for row, (resin_id, printer_id) in enumerate(missing):
+        table["pairs"][f"{resin_id}__{printer_id}"] = [
+            {
+                "id": ok_profiles[col]["id"],
+                "resinId": ok_profiles[col]["resinId"],
+                "printerId": ok_profiles[col]["printerId"],
+                "distance": round(float(dist), 4),
+                "sameResin": bool(same_resin[row, col]),
+            }
+            for col, dist in zip(nearest[row], nearest_dist[row])
+        ]
+
+    return table
+
+
+def write_fallback_table(database: Dict[str, Any], output_path: Path, k: int = DEFAULT_K) -> Dict[str, Any]:
+    table = build_fallback_table(database, k=k)
+    Path(output_path).write_text(json.dumps(table, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    return table
+
+
+def lookup_fallback(table: Dict[str, Any], resin_id: str, printer_id: str) -> Optional[List[Dict[str, Any]]]:
+    return table["pairs"].get(f"{resin_id}__{printer_id}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Nearest ok profiles for resin x printer pairs without parameters")
+    parser.add_argument("database", type=Path, help="print-parameters-db.json / resins_extracted.json")
+    parser.add_argument("resin_id", nargs="?")
+    parser.add_argument("printer_id", nargs="?")
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    args = parser.parse_args()
+
+    table = build_fallback_table(json.loads(args.database.read_text(encoding="utf-8")), k=args.k)
+    if args.resin_id and args.printer_id:
+        print(json.dumps(lookup_fallback(table, args.resin_id, args.printer_id), ensure_ascii=False, indent=2))
+    else:
+        print(f"{len(table['pairs'])} pairs without parameters, {table['k']} suggestions each.")
+
+
+if __name__ == "__main__":
+    main()
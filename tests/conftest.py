@@ -0,0 +1,40 @@
+"""Shared fixtures; the modules under test live at the repo root and in scripts/."""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def make_documents(count: int, dim: int = 8, seed: int = 0) -> List[dict]:
+    """Documents shaped like kb_index.json entries, with random embeddings and metadata."""
+    rng = np.random.default_rng(seed)
+    categories = ("troubleshooting", "parametros", "geral")
+    return [
+        {
+            "id": f"doc{idx}.txt",
+            "title": f"Documento {idx}",
+            "content": f"conteúdo do documento {idx} " * (1 + idx % 5),
+            "category": categories[idx % 3],
+            "embedding": rng.standard_normal(dim).tolist(),
+            "metadata": {
+                "source_file": f"doc{idx}.txt",
+                "category": categories[idx % 3],
+                "resins": ["iron"] if idx % 2 == 0 else ["spark"],
+                "tags": [],
+            },
+        }
+        for idx in range(count)
+    ]
+
+
+@pytest.fixture
+def documents() -> List[dict]:
+    return make_documents(40)
@@ -0,0 +1,52 @@
+import random
+
+from scripts.entity_extractor import EntityExtractor, naive_extract, select_longest
+
+CATALOG = {
+    "resins": [
+        {"id": "iron", "name": "Iron"},
+        {"id": "iron_7030", "name": "Iron 70/30"},
+        {"id": "spark", "name": "Spark"},
+        {"id": "pyroblast", "name": "Pyroblast+"},
+    ],
+    "printers": [
+        {"id": "elegoo__mars_4", "brand": "Elegoo", "model": "Mars 4"},
+        {"id": "anycubic__photon_mono", "brand": "Anycubic", "model": "Photon Mono"},
+    ],
+    "profiles": [],
+}
+
+
+def _keys(hits):
+    return sorted((hit["start"], hit["end"], hit["type"], hit["id"]) for hit in hits)
+
+
+def test_automaton_matches_naive_scan():
+    extractor = EntityExtractor.from_database(CATALOG)
+    names = [pattern["text"] for pattern in extractor.patterns]
+    filler = "qual tempo de exposição ideal para minha impressora resina peça rachando".split()
+    rng = random.Random(7)
+    for _ in range(300):
+        words = rng.sample(filler, 5) + rng.sample(names, 2)
+        rng.shuffle(words)
+        message = " ".join(words)
+        assert _keys(extractor.extract(message)) == _keys(naive_extract(extractor.patterns, message))
+
+
+def test_offsets_point_into_original_text():
+    extractor = EntityExtractor.from_database(CATALOG)
+    message = "Exposição da IRON na Elegoo Mars-4?"
+    spans = {message[hit["start"] : hit["end"]] for hit in extractor.extract(message)}
+    assert "IRON" in spans
+    assert "Elegoo Mars-4" in spans
+
+
+def test_select_longest_drops_nested_mentions():
+    extractor = EntityExtractor.from_database(CATALOG)
+    hits = select_longest(extractor.extract("iron 70/30 na photon mono"))
+    assert {(hit["type"], hit["id"]) for hit in hits} == {("resin", "iron_7030"), ("printer", "anycubic__photon_mono")}
+
+
+def test_words_are_not_matched_inside_other_words():
+    extractor = EntityExtractor.from_database(CATALOG)
+    assert extractor.extract("ironia e sparkling") == []
@@ -0,0 +1,46 @@
+import json
+
+import numpy as np
+
+from faq_index import FaqIndex, build_faq_index
+from kb_embeddings import EmbeddingProvider
+
+
+class TableProvider(EmbeddingProvider):
+    def __init__(self, vectors):
+        super().__init__()
+        self.vectors = vectors
+
+    def embed(self, texts):
+        self._count(requests=1, texts=len(texts))
+        return [self.vectors[text] for text in texts]
+
+
+def test_thresholds_and_paraphrase_matching(tmp_path):
+    source = tmp_path / "faq.json"
+    source.write_text(
+        json.dumps(
+            [
+                {"question": "Como limpar a tela?", "answer": "Com IPA.", "paraphrases": ["limpar tela"], "threshold": 0},
+                {"question": "Tempo de cura?", "answer": "5 minutos."},
+            ]
+        ),
+        encoding="utf-8",
+    )
+    provider = TableProvider({"Como limpar a tela?": [1.0, 0.0], "limpar tela": [0.8, 0.6], "Tempo de cura?": [0.0, 1.0]})
+    output = tmp_path / "faq_index.json"
+    payload = build_faq_index([source], output, 0.85, batch_size=2, dry_run=False, provider=provider)
+
+    assert [entry["threshold"] for entry in payload["entries"]] == [0.0, 0.85]
+    assert provider.stats()["texts"] == 3
+
+    index = FaqIndex.load(output)
+    assert index.match([0.8, 0.6])["answer"] == "Com IPA."  # paráfrase exata
+    # Similaridade ~0.1: só passa porque o limiar explícito 0 não virou o padrão 0.85.
+    assert index.match([0.1, -1.0])["answer"] == "Com IPA."
+    assert index.match([-1.0, 0.05]) is None
+
+    again = TableProvider({})
+    build_faq_index([source], output, 0.85, batch_size=2, dry_run=False, provider=again)
+    assert again.stats()["texts"] == 0  # vetores reaproveitados pelo hash do texto
+    assert np.allclose(FaqIndex.load(output).matrix, index.matrix)
@@ -0,0 +1,31 @@
+import json
+
+from scripts.import_stats import ImportStats, count_profiles
+
+
+def test_report_totals_and_optional_read_times(tmp_path):
+    stats = ImportStats("export.html")
+    with stats.timed(stats.timings, "readSeconds"):
+        pass
+    table = stats.sheet("Iron", timed_read=False)
+    table["rowsScanned"] += 4
+    count_profiles(table, [{"status": "ok"}, {"status": "coming_soon"}, {"status": "ok"}])
+    stats.dump_json({"profiles": []}, tmp_path / "db.json")
+
+    report = stats.write(tmp_path / "stats.json")
+    assert report == json.loads((tmp_path / "stats.json").read_text(encoding="utf-8"))
+    assert "readSeconds" not in report["sheets"][0]
+    assert "readSeconds" not in report["totals"]
+    assert "readSeconds" in report["timings"]
+    assert report["totals"]["rowsScanned"] == 4
+    assert report["totals"]["profilesByStatus"] == {"ok": 2, "coming_soon": 1}
+    assert report["serialization"]["db.json"]["bytes"] == len('{"profiles": []}')
+
+
+def test_excel_sheets_keep_read_time():
+    stats = ImportStats("params.xlsx")
+    with stats.timed(stats.sheet("Iron"), "readSeconds"):
+        pass
+    report = stats.report()
+    assert report["sheets"][0]["readSeconds"] >= 0
+    assert "readSeconds" in report["totals"]
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from kb_bundle import BundleIntegrityError, iter_documents, load_manifest, read_shard, write_bundle
+
+
+def _docs(version):
+    return [
+        {"id": "a1", "category": "geral", "content": f"a {version}"},
+        {"id": "t1", "category": "troubleshooting", "content": "fixo"},
+    ]
+
+
+def test_round_trip_by_category(tmp_path):
+    manifest = write_bundle(tmp_path, _docs(1), "model", "2026-01-01")
+    assert manifest["total_documents"] == 2
+    assert [doc["id"] for doc in iter_documents(tmp_path, categories=["troubleshooting"])] == ["t1"]
+    assert load_manifest(tmp_path) == manifest
+
+
+def test_reader_holding_previous_manifest_survives_one_rewrite(tmp_path):
+    first = write_bundle(tmp_path, _docs(1), "model", "g1")
+    second = write_bundle(tmp_path, _docs(2), "model", "g2")
+    assert [doc["content"] for doc in iter_documents(tmp_path, manifest=first)] == ["a 1", "fixo"]
+
+    write_bundle(tmp_path, _docs(3), "model", "g3")
+    files = {path.name for path in tmp_path.glob("shard-*.json")}
+    first_files = {shard["file"] for shard in first["shards"]}
+    second_files = {shard["file"] for shard in second["shards"]}
+    assert second_files <= files
+    assert not (first_files - second_files) & files
+
+
+def test_checksum_mismatch_is_detected(tmp_path):
+    manifest = write_bundle(tmp_path, _docs(1), "model", "g1")
+    shard = manifest["shards"][0]
+    path = tmp_path / shard["file"]
+    data = json.loads(path.read_text(encoding="utf-8"))
+    data["documents"][0]["content"] = "adulterado"
+    path.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    with pytest.raises(BundleIntegrityError):
+        read_shard(tmp_path, shard)
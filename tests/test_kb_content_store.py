@@ -0,0 +1,44 @@
+import pytest
+
+from conftest import make_documents
+from kb_build import save_index, save_lean_index
+from kb_content_store import ContentStore, write_content_store
+from kb_search import KnowledgeSearch
+
+
+@pytest.mark.parametrize("block_size", [64, 64 * 1024])
+def test_round_trip_across_blocks(tmp_path, block_size):
+    documents = make_documents(60)
+    documents[5]["content"] = "acentuação, emoji 🧪 e \"aspas\""
+    path = tmp_path / "kb_content.bin"
+    summary = write_content_store(documents, path, block_size=block_size, codec="zlib")
+    assert summary["documents"] == 60
+    assert (summary["blocks"] > 1) == (block_size == 64)
+
+    with ContentStore(path, cached_blocks=2) as store:
+        for doc in reversed(documents):
+            assert store.get(doc["id"]) == {"title": doc["title"], "content": doc["content"]}
+        assert store.get("inexistente") is None
+        assert len(store._cache) <= 2
+    assert store._handle.closed
+
+
+def test_rejects_files_without_trailer(tmp_path):
+    path = tmp_path / "broken.bin"
+    path.write_bytes(b"not a content store at all")
+    with pytest.raises(ValueError):
+        ContentStore(path)
+
+
+def test_lean_index_search_hydrates_text(tmp_path):
+    documents = make_documents(25)
+    index = tmp_path / "kb_index.json"
+    payload = save_index(index, documents)
+    store = tmp_path / "kb_content.bin"
+    write_content_store(documents, store)
+    lean = save_lean_index(index, documents, payload, store)
+
+    engine = KnowledgeSearch.load(lean)
+    assert all("content" not in doc for doc in engine.documents)
+    hit = engine.search(documents[7]["embedding"], top_k=1)[0]
+    assert (hit["id"], hit["title"], hit["content"]) == (documents[7]["id"], documents[7]["title"], documents[7]["content"])
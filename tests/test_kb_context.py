@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+import kb_context
+from conftest import make_documents
+from kb_build import annotate_token_counts
+from kb_context import CONTEXT_HEADER, EMPTY_CONTEXT, ContextPacker
+from kb_search import KnowledgeSearch
+from kb_tokens import count_tokens, document_block_body, tokenizer_name
+
+
+def _engine(count=40):
+    documents = make_documents(count)
+    annotate_token_counts(documents)
+    return KnowledgeSearch(documents, tokenizer=tokenizer_name())
+
+
+def test_token_counts_follow_the_block_format():
+    documents = make_documents(3)
+    assert annotate_token_counts(documents) == 3
+    assert documents[1]["token_count"] == count_tokens(document_block_body(documents[1]))
+    assert annotate_token_counts(documents) == 0
+
+
+@pytest.mark.parametrize("budget", [40, 120, 300, 1000, 20000])
+def test_packed_context_fits_budget_exactly(budget):
+    engine = _engine()
+    query = np.random.default_rng(9).standard_normal(8)
+    packed = ContextPacker(engine, token_budget=budget).pack(query)
+    if packed["documents"]:
+        assert packed["tokens"] == count_tokens(packed["context"])
+        assert packed["tokens"] <= budget
+        assert packed["context"].startswith(CONTEXT_HEADER)
+    else:
+        assert packed["context"] == EMPTY_CONTEXT
+
+
+def test_without_diversity_picks_by_relevance():
+    engine = _engine()
+    query = np.random.default_rng(2).standard_normal(8)
+    packed = ContextPacker(engine, token_budget=20000, diversity=0.0, candidates=5).pack(query)
+    assert [doc["id"] for doc in packed["documents"]] == [hit["id"] for hit in engine.search(query, top_k=5)]
+
+
+def test_diversity_skips_near_duplicates():
+    documents = make_documents(6)
+    documents[1]["embedding"] = list(documents[0]["embedding"])
+    annotate_token_counts(documents)
+    engine = KnowledgeSearch(documents, tokenizer=tokenizer_name())
+    packer = ContextPacker(engine, token_budget=20000, diversity=0.7, candidates=6)
+    chosen = [doc["id"] for doc in packer.pack(documents[0]["embedding"])["documents"]]
+    assert chosen[0] in ("doc0.txt", "doc1.txt")
+    assert {"doc0.txt", "doc1.txt"} & set(chosen[1:2]) == set()
+
+
+def test_filters_restrict_candidates():
+    engine = _engine()
+    packed = ContextPacker(engine, token_budget=20000).pack([1.0] * 8, filters={"category": "parametros"})
+    assert packed["documents"]
+    assert {doc["category"] for doc in packed["documents"]} == {"parametros"}
+
+
+def test_tokens_are_counted_on_the_final_text(monkeypatch):
+    # Tokenizer que funde a emenda entre blocos ("\n\n**"): o todo custa mais que a soma das partes.
+    def merging_count(text):
+        return count_tokens(text) + 6 * text.count("\n\n**")
+
+    monkeypatch.setattr(kb_context, "count_tokens", merging_count)
+    kb_context._prefix_tokens.cache_clear()
+    engine = KnowledgeSearch(make_documents(40))
+    try:
+        for budget in (60, 120, 300, 1000):
+            packed = ContextPacker(engine, token_budget=budget).pack(np.ones(8))
+            assert packed["tokens"] == merging_count(packed["context"])
+            assert packed["tokens"] <= budget
+    finally:
+        kb_context._prefix_tokens.cache_clear()
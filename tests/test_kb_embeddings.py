@@ -0,0 +1,92 @@
+import argparse
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from kb_build import build_index
+from kb_embeddings import EmbeddingError, EmbeddingProvider, HttpEmbeddingProvider
+from scripts.fake_embeddings_server import FakeEmbeddings, fake_embedding, make_handler
+
+
+def _server_args(**overrides):
+    defaults = dict(
+        dim=8, latency_ms=0.0, per_item_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+        rpm=0.0, tpm=0.0, max_inputs=2048, seed=0, verbose=False,
+    )
+    return argparse.Namespace(**{**defaults, **overrides})
+
+
+@pytest.fixture
+def fake_server():
+    servers = []
+
+    def start(**overrides):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(FakeEmbeddings(_server_args(**overrides))))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_provider_interface_is_abstract():
+    with pytest.raises(TypeError):
+        EmbeddingProvider()
+
+
+def test_concurrent_batches_keep_order_and_survive_errors(fake_server):
+    url = fake_server(error_rate=0.3, seed=4)
+    provider = HttpEmbeddingProvider(url, "m", max_retries=10, backoff=0.001, max_backoff=0.01)
+    texts = [f"texto {idx}" for idx in range(40)]
+    vectors = provider.embed_many(texts, batch_size=3, concurrency=4)
+
+    expected = np.vstack([fake_embedding(text, 8, "m") for text in texts])
+    assert np.allclose(np.asarray(vectors), expected, atol=1e-6)
+    stats = provider.stats()
+    assert stats["texts"] == 40 and stats["failures"] == 0 and stats["retries"] > 0
+
+
+def test_gives_up_with_the_last_error_after_max_retries(fake_server):
+    provider = HttpEmbeddingProvider(fake_server(error_rate=1.0), "m", max_retries=2, backoff=0.001)
+    with pytest.raises(EmbeddingError) as info:
+        provider.embed(["a"])
+    assert "3 tentativas" in str(info.value) and "HTTP 500" in str(info.value)
+    assert info.value.__cause__ is not None
+    assert provider.stats() == {"requests": 3, "texts": 1, "retries": 2, "failures": 1}
+
+
+def test_request_larger_than_tpm_is_rejected_not_retried(fake_server):
+    provider = HttpEmbeddingProvider(fake_server(tpm=50), "m", max_retries=5, backoff=0.001)
+    with pytest.raises(EmbeddingError, match="HTTP 400"):
+        provider.embed(["x" * 1000])
+    assert provider.stats()["retries"] == 0
+
+
+def test_failed_group_loses_at_most_batch_size_documents(tmp_path):
+    kb = tmp_path / "kb"
+    kb.mkdir()
+    for idx in range(12):
+        (kb / f"f{idx:02d}.txt").write_text(f"T{idx}\ncorpo {idx}\n", encoding="utf-8")
+    output = tmp_path / "kb_index.json"
+
+    class FailsAfterFive(EmbeddingProvider):
+        def embed(self, texts):
+            self._count(texts=len(texts))
+            if self.counters["texts"] > 5:
+                raise EmbeddingError("falha simulada")
+            return [[1.0, 0.0] for _ in texts]
+
+    with pytest.raises(EmbeddingError):
+        build_index(
+            kb, output, start=0, limit=None, batch_size=5, max_chars=8000, dry_run=False,
+            entities_path=None, provider=FailsAfterFive(), embed_batch_size=64, embed_concurrency=4,
+        )
+    saved = json.loads(output.read_text(encoding="utf-8"))["documents"]
+    assert sorted(doc["id"] for doc in saved) == [f"f{idx:02d}.txt" for idx in range(5)]
@@ -0,0 +1,145 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import kb_build
+from kb_build import build_index
+from kb_embeddings import EmbeddingProvider
+from kb_watch import changed_paths, importer_command, snapshot
+
+
+class CountingProvider(EmbeddingProvider):
+    model = "fake"
+
+    def __init__(self):
+        super().__init__()
+        self.seen = []
+
+    def embed(self, texts):
+        self._count(requests=1, texts=len(texts))
+        self.seen.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def _build(input_dir, output, provider, **kwargs):
+    return build_index(
+        input_dir,
+        output,
+        start=0,
+        limit=None,
+        batch_size=5,
+        max_chars=8000,
+        dry_run=False,
+        entities_path=None,
+        provider=provider,
+        **kwargs,
+    )
+
+
+def _docs(output):
+    return {doc["id"]: doc for doc in json.loads(Path(output).read_text(encoding="utf-8"))["documents"]}
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    kb = Path("kb")
+    kb.mkdir()
+    for name in ("a", "b", "c"):
+        (kb / f"{name}.txt").write_text(f"Titulo {name}\ncorpo {name}\n", encoding="utf-8")
+    _build(kb, Path("kb_index.json"), CountingProvider())
+    return kb, Path("kb_index.json")
+
+
+def test_refresh_reembeds_only_changed_files(corpus):
+    kb, output = corpus
+    (kb / "b.txt").write_text("Titulo b\ncorpo b editado\n", encoding="utf-8")
+    provider = CountingProvider()
+    _build(kb, output, provider, refresh_changed=True)
+    assert provider.seen == ["Titulo b\ncorpo b editado"]
+    assert _docs(output)["b.txt"]["content"] == "corpo b editado"
+
+
+def test_hashless_documents_adopt_hash_only_when_text_is_unchanged(corpus):
+    kb, output = corpus
+    raw = json.loads(output.read_text(encoding="utf-8"))
+    for doc in raw["documents"]:
+        doc.pop("content_hash")
+    output.write_text(json.dumps(raw), encoding="utf-8")
+    (kb / "a.txt").write_text("Titulo a\ncorpo a editado antes do primeiro ciclo\n", encoding="utf-8")
+
+    provider = CountingProvider()
+    _build(kb, output, provider, refresh_changed=True)
+    docs = _docs(output)
+    assert provider.seen == ["Titulo a\ncorpo a editado antes do primeiro ciclo"]
+    assert docs["a.txt"]["content"] == "corpo a editado antes do primeiro ciclo"
+    assert all(doc.get("content_hash") for doc in docs.values())
+
+
+def test_prune_matches_relative_sources_with_absolute_input_dir(corpus):
+    kb, output = corpus
+    (kb / "c.txt").unlink()
+    _build(kb.resolve(), output, CountingProvider(), refresh_changed=True, prune_missing=True)
+    assert sorted(_docs(output)) == ["a.txt", "b.txt"]
+
+
+def test_params_digest_reembeds_only_edited_chunks_and_drops_removed(corpus):
+    kb, output = corpus
+    digest = Path("digest.json")
+    chunks = [{"id": f"iron__p{idx}", "resin": "Iron", "printer": f"P{idx}", "text": f"exposição={idx}s"} for idx in range(4)]
+    digest.write_text(json.dumps({"chunks": chunks}), encoding="utf-8")
+    first = CountingProvider()
+    _build(kb, output, first, refresh_changed=True, params_digest=digest)
+    assert len(first.seen) == 4
+
+    chunks[1]["text"] = "exposição=9s"
+    del chunks[3]
+    digest.write_text(json.dumps({"chunks": chunks}), encoding="utf-8")
+    provider = CountingProvider()
+    _build(kb, output, provider, refresh_changed=True, params_digest=digest)
+
+    docs = _docs(output)
+    assert provider.seen == ["exposição=9s"]
+    assert docs["params::iron__p1"]["content"] == "exposição=9s"
+    assert "params::iron__p3" not in docs
+    assert sorted(doc_id for doc_id in docs if doc_id.startswith("params::")) == [
+        "params::iron__p0",
+        "params::iron__p1",
+        "params::iron__p2",
+    ]
+
+
+def test_tokenizer_change_recounts_even_after_checkpoints(corpus, monkeypatch):
+    kb, output = corpus
+    assert json.loads(output.read_text(encoding="utf-8"))["tokenizer"] == kb_build.tokenizer_name()
+    monkeypatch.setattr(kb_build, "tokenizer_name", lambda: "fake-bpe")
+    monkeypatch.setattr(kb_build, "count_tokens", lambda text: 7)
+    (kb / "d.txt").write_text("Titulo d\ncorpo d\n", encoding="utf-8")
+    _build(kb, output, CountingProvider(), refresh_changed=True)
+
+    raw = json.loads(output.read_text(encoding="utf-8"))
+    assert raw["tokenizer"] == "fake-bpe"
+    assert {doc["id"]: doc["token_count"] for doc in raw["documents"]} == dict.fromkeys(
+        ["a.txt", "b.txt", "c.txt", "d.txt"], 7
+    )
+
+
+def test_snapshot_and_changed_paths(tmp_path):
+    (tmp_path / "a.txt").write_text("1", encoding="utf-8")
+    (tmp_path / "ignored.md").write_text("x", encoding="utf-8")
+    before = snapshot([tmp_path])
+    assert list(before) == [tmp_path / "a.txt"]
+
+    (tmp_path / "a.txt").write_text("22", encoding="utf-8")
+    (tmp_path / "b.txt").write_text("3", encoding="utf-8")
+    assert changed_paths(before, snapshot([tmp_path])) == [tmp_path / "a.txt", tmp_path / "b.txt"]
+
+
+def test_importer_command_targets_the_digest_folder(tmp_path):
+    digest = tmp_path / "data" / "print-parameters-rag-grouped.json"
+    command = importer_command(Path("export.html"), digest)
+    assert command[1].endswith("import_print_params_from_html.py")
+    assert command[-2:] == [str(tmp_path / "data" / "resins_extracted.json"), "--grouped-digest"]
+    with pytest.raises(SystemExit):
+        importer_command(Path("export.csv"), digest)
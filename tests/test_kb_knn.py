@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from conftest import make_documents
+from kb_build import save_index
+from kb_knn import build_knn_graph, embedding_matrix, load_knn_graph, write_knn_graph
+from kb_search import KnowledgeSearch
+
+
+def _brute_force(matrix, has_vector, k):
+    scores = matrix @ matrix.T
+    scores[:, ~has_vector] = -np.inf
+    np.fill_diagonal(scores, -np.inf)
+    return np.argsort(-scores, axis=1, kind="stable")[:, :k]
+
+
+@pytest.mark.parametrize("block_rows", [1, 7, 1024])
+def test_blocked_graph_matches_brute_force(block_rows):
+    documents = make_documents(50, dim=12, seed=4)
+    documents[10]["embedding"] = []  # sem vetor: fica sem vizinhos e nunca é vizinho
+    matrix, has_vector = embedding_matrix(documents)
+    neighbors, scores = build_knn_graph(matrix, has_vector, 5, block_rows=block_rows)
+
+    expected = _brute_force(matrix, has_vector, 5)
+    valid = has_vector.copy()
+    assert (neighbors[valid] == expected[valid]).all()
+    assert (neighbors[10] == -1).all()
+    assert not (neighbors == 10).any()
+    assert (np.diff(scores[valid].astype(np.float32), axis=1) <= 1e-3).all()
+
+
+def test_k_is_capped_by_documents_with_vectors():
+    documents = make_documents(4)
+    neighbors, _ = build_knn_graph(*embedding_matrix(documents), k=10)
+    assert neighbors.shape == (4, 3)
+
+
+def test_related_and_expand_use_the_stored_graph(tmp_path):
+    documents = make_documents(30)
+    index = tmp_path / "kb_index.json"
+    payload = save_index(index, documents)
+    write_knn_graph(index.with_suffix(".knn.npz"), documents, 4, payload["generation"])
+    engine = KnowledgeSearch.load(index)
+
+    graph = load_knn_graph(index.with_suffix(".knn.npz"))
+    related = engine.related("doc3.txt", 2)
+    assert [hit["id"] for hit in related] == [documents[row]["id"] for row in graph["neighbors"][3][:2]]
+
+    hits = engine.search(documents[0]["embedding"], top_k=2)
+    expanded = engine.expand(hits, per_hit=2)
+    assert expanded[:2] == hits
+    assert len({hit["id"] for hit in expanded}) == len(expanded)
+    assert all(hit["expanded_from"] in {h["id"] for h in hits} for hit in expanded[2:])
+
+
+def test_graph_from_another_generation_is_rejected(tmp_path):
+    documents = make_documents(10)
+    index = tmp_path / "kb_index.json"
+    payload = save_index(index, documents)
+    write_knn_graph(index.with_suffix(".knn.npz"), documents, 3, payload["generation"])
+    save_index(index, documents)  # nova geração, grafo antigo
+
+    engine = KnowledgeSearch.load(index)
+    with pytest.raises(ValueError):
+        engine.related("doc1.txt")
+    with pytest.raises(KeyError):
+        engine.related("inexistente")
@@ -0,0 +1,23 @@
+import numpy as np
+
+from conftest import make_documents
+from kb_parallel import ParallelSearch
+from kb_search import KnowledgeSearch
+
+
+def test_parallel_search_batch_matches_single_process():
+    engine = KnowledgeSearch(make_documents(101))
+    queries = np.random.default_rng(2).standard_normal((4, 8))
+    filters = [None, {"category": "parametros"}, {"category": "nenhuma"}, {"resins": ["iron", "spark"]}]
+    top_ks = [3, 7, 2, 200]
+    expected = engine.search_batch(queries, top_ks, filters, min_score=-0.3)
+    with ParallelSearch(engine, workers=2) as parallel:
+        got = parallel.search_batch(queries, top_ks, filters, min_score=-0.3)
+        single = parallel.search(queries[0], 3)
+    assert [[hit["id"] for hit in hits] for hits in got] == [[hit["id"] for hit in hits] for hits in expected]
+    assert [hit["id"] for hit in single] == [hit["id"] for hit in expected[0]]
+
+
+def test_empty_corpus_returns_empty_results():
+    with ParallelSearch(KnowledgeSearch([]), workers=1) as parallel:
+        assert parallel.search_batch(np.zeros((2, 0)), 3) == [[], []]
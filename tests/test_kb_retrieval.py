@@ -0,0 +1,112 @@
+from conftest import make_documents
+from kb_build import save_index, save_lean_index
+from kb_content_store import write_content_store
+from kb_knn import write_knn_graph
+from kb_retrieval import QueryCache, Retriever, normalize_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_query_cache_lru_and_ttl():
+    clock = FakeClock()
+    cache = QueryCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "a" becomes most recent
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.evictions == 1
+
+    clock.now = 11
+    assert cache.get("a") is None and cache.expirations == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_normalize_query_matches_rag_search():
+    assert normalize_query("  Tempo de EXPOSIÇÃO, Iron!! ") == "tempo de exposicao iron"
+
+
+def _embedder(documents, calls):
+    def embed(texts):
+        calls.extend(texts)
+        return [documents[3]["embedding"] for _ in texts]
+
+    return embed
+
+
+def test_results_are_cached_and_returned_as_copies(tmp_path):
+    documents = make_documents(20)
+    index = tmp_path / "kb_index.json"
+    save_index(index, documents)
+    calls = []
+    retriever = Retriever(index, embed_fn=_embedder(documents, calls), check_interval=0)
+
+    first = retriever.search("Peça rachando", top_k=3)
+    first[0]["metadata"]["resins"].append("corrompido")
+    second = retriever.search("peca  RACHANDO", top_k=3)
+
+    assert calls == ["Peça rachando"]
+    assert retriever.stats()["results"]["hits"] == 1
+    assert "corrompido" not in second[0]["metadata"]["resins"]
+    assert "corrompido" not in retriever.search("peca rachando", top_k=3)[0]["metadata"]["resins"]
+
+
+def test_new_generation_invalidates_results(tmp_path):
+    documents = make_documents(20)
+    index = tmp_path / "kb_index.json"
+    save_index(index, documents)
+    retriever = Retriever(index, embed_fn=_embedder(documents, []), check_interval=0)
+    retriever.search("consulta", top_k=2)
+
+    save_index(index, documents[:10])
+    hits = retriever.search("consulta", top_k=2)
+    assert retriever.invalidations == 1
+    assert len(retriever.engine.documents) == 10
+    assert retriever.stats()["results"]["hits"] == 0
+    assert all(int(hit["id"][3:-4]) < 10 for hit in hits)
+
+
+def test_lean_index_keeps_content_store_and_knn_graph(tmp_path):
+    documents = make_documents(20)
+    index = tmp_path / "kb_index.json"
+    payload = save_index(index, documents)
+    graph = index.with_suffix(".knn.npz")
+    write_knn_graph(graph, documents, 3, payload["generation"])
+    store = tmp_path / "kb_content.bin"
+    write_content_store(documents, store)
+    lean = save_lean_index(index, documents, {**payload, "knn_graph": graph}, store)
+
+    retriever = Retriever(lean, embed_fn=_embedder(documents, []))
+    hit = retriever.search("consulta", top_k=1)[0]
+    assert hit["id"] == documents[3]["id"]
+    assert hit["content"] == documents[3]["content"]
+    assert len(retriever.engine.related(hit["id"], 2)) == 2
+
+
+def test_reloads_close_retired_content_stores(tmp_path):
+    documents = make_documents(12)
+    index = tmp_path / "kb_index.json"
+    store = tmp_path / "kb_content.bin"
+    write_content_store(documents, store)
+
+    def publish(docs):
+        return save_lean_index(index, docs, save_index(index, docs), store)
+
+    lean = publish(documents)
+    retriever = Retriever(lean, embed_fn=_embedder(documents, []), check_interval=0)
+    stores = [retriever.engine.content_store]
+    for count in (11, 10):
+        publish(documents[:count])
+        retriever.search("consulta", top_k=1)
+        stores.append(retriever.engine.content_store)
+
+    assert len({id(item) for item in stores}) == 3
+    assert [item._handle.closed for item in stores] == [True, False, False]
+    assert retriever.search("consulta", top_k=1)[0]["content"]
+    retriever.close()
+    assert all(item._handle.closed for item in stores)
@@ -0,0 +1,85 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import ROOT
+from kb_metadata import build_filter_index, decode_bitmap, encode_bitmap
+from kb_search import KnowledgeSearch
+
+
+def test_bitmap_round_trip():
+    positions = [0, 3, 64, 129]
+    mask = decode_bitmap(encode_bitmap(positions), 130)
+    assert mask.shape == (130,)
+    assert np.flatnonzero(mask).tolist() == positions
+    assert not decode_bitmap(encode_bitmap([]), 10).any()
+
+
+def test_filter_index_lowercases_values(documents):
+    filters = build_filter_index(documents)
+    assert set(filters) == {"source_file", "category", "resins", "tags"}
+    iron = decode_bitmap(filters["resins"]["iron"], len(documents))
+    assert np.flatnonzero(iron).tolist() == list(range(0, len(documents), 2))
+
+
+def test_candidates_and_across_fields_or_within_field(documents):
+    engine = KnowledgeSearch(documents)
+    mask = engine.candidates({"category": ["troubleshooting", "geral"], "resins": "IRON"})
+    expected = [
+        idx
+        for idx, doc in enumerate(documents)
+        if doc["metadata"]["category"] in ("troubleshooting", "geral") and "iron" in doc["metadata"]["resins"]
+    ]
+    assert np.flatnonzero(mask).tolist() == expected
+
+
+def test_filtered_search_matches_brute_force(documents):
+    engine = KnowledgeSearch(documents)
+    query = np.random.default_rng(3).standard_normal(8)
+    hits = engine.search(query, top_k=4, filters={"category": "parametros"})
+
+    rows = [idx for idx, doc in enumerate(documents) if doc["metadata"]["category"] == "parametros"]
+    vectors = np.asarray([documents[idx]["embedding"] for idx in rows])
+    scores = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    expected = [documents[rows[idx]]["id"] for idx in np.argsort(-scores)[:4]]
+    assert [hit["id"] for hit in hits] == expected
+    assert engine.last_scored == len(rows)
+
+
+def test_search_batch_matches_single_searches(documents):
+    engine = KnowledgeSearch(documents)
+    queries = np.random.default_rng(5).standard_normal((3, 8))
+    filters = [None, {"resins": "spark"}, {"category": "nenhuma"}]
+    batch = engine.search_batch(queries, [2, 3, 4], filters)
+    singles = [engine.search(query, k, item) for query, k, item in zip(queries, [2, 3, 4], filters)]
+    assert [[hit["id"] for hit in hits] for hits in batch] == [[hit["id"] for hit in hits] for hits in singles]
+    assert batch[2] == []
+
+
+def test_filtered_search_batch_scores_only_the_candidate_union(documents):
+    engine = KnowledgeSearch(documents)
+    queries = np.random.default_rng(7).standard_normal((2, 8))
+    filters = [{"category": "parametros"}, {"category": "geral", "resins": "iron"}]
+    batch = engine.search_batch(queries, 3, filters)
+
+    union = np.logical_or(engine.candidates(filters[0]), engine.candidates(filters[1]))
+    assert engine.last_scored == 2 * int(union.sum()) < 2 * len(documents)
+    singles = [engine.search(query, 3, item) for query, item in zip(queries, filters)]
+    assert [[hit["id"] for hit in hits] for hits in batch] == [[hit["id"] for hit in hits] for hits in singles]
+    assert [hit["similarity"] for hit in batch[0]] == pytest.approx([hit["similarity"] for hit in singles[0]])
+
+
+def test_unknown_filter_and_bad_top_k_raise(documents):
+    engine = KnowledgeSearch(documents)
+    with pytest.raises(KeyError):
+        engine.search([1.0] * 8, filters={"colour": "red"})
+    with pytest.raises(ValueError):
+        engine.search([1.0] * 8, top_k=0)
+
+
+def test_search_modules_do_not_import_the_build_script():
+    code = "import sys, kb_search, kb_service, kb_parallel, kb_retrieval, kb_context; print('kb_build' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
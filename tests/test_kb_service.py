@@ -0,0 +1,89 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from conftest import make_documents
+from kb_search import KnowledgeSearch
+from kb_service import RetrievalService, synthetic_engine
+
+
+def _run(engine, scenario, window_ms=20.0):
+    async def main():
+        service = RetrievalService(engine, window_ms=window_ms, max_batch=64)
+        service.batcher.start()
+        try:
+            return await scenario(service)
+        finally:
+            await service.batcher.stop()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_requests_share_one_batch_and_match_direct_search():
+    engine = KnowledgeSearch(make_documents(50))
+    queries = np.random.default_rng(1).standard_normal((6, 8))
+
+    async def scenario(service):
+        responses = await asyncio.gather(
+            *(service.handle_search({"vector": query.tolist(), "top_k": 3}) for query in queries)
+        )
+        return responses, service.batcher.stats()
+
+    responses, stats = _run(engine, scenario)
+    assert stats["batches"] == 1 and stats["largest_batch"] == 6
+    for (status, body), query in zip(responses, queries):
+        assert status == 200
+        assert [hit["id"] for hit in body["results"]] == [hit["id"] for hit in engine.search(query, 3)]
+        assert "content" not in body["results"][0]
+
+
+@pytest.mark.parametrize(
+    "bad",
+    [
+        {"vector": ["x"] * 8},
+        {"vector": [0.1] * 7},
+        {"vector": [0.1] * 8, "top_k": -3},
+        {"vector": [0.1] * 8, "top_k": 0},
+        {"vector": [0.1] * 8, "top_k": "5"},
+        {"vector": [0.1] * 8, "top_k": 2.5},
+        {"vector": [0.1] * 8, "filters": {"colour": "red"}},
+        {"vector": [0.1] * 8, "filters": {"category": 3}},
+    ],
+)
+def test_bad_request_fails_alone(bad):
+    engine = KnowledgeSearch(make_documents(30))
+
+    async def scenario(service):
+        return await asyncio.gather(
+            service.handle_search(bad), service.handle_search({"vector": [0.1] * 8, "top_k": 2})
+        )
+
+    (bad_status, bad_body), (good_status, good_body) = _run(engine, scenario)
+    assert bad_status == 400 and bad_body["error"]
+    assert good_status == 200 and len(good_body["results"]) == 2
+
+
+def test_batch_error_is_isolated_to_the_failing_query():
+    engine = KnowledgeSearch(make_documents(30))
+
+    async def scenario(service):
+        # Bypasses request validation, so the error comes from search_batch itself.
+        return await asyncio.gather(
+            service.batcher.submit([1.0] * 8, 2, None),
+            service.batcher.submit([1.0] * 8, 2, {"colour": "red"}),
+            service.batcher.submit([1.0] * 8, 3, None),
+            return_exceptions=True,
+        )
+
+    first, failed, last = _run(engine, scenario)
+    assert len(first) == 2 and len(last) == 3
+    assert isinstance(failed, KeyError)
+
+
+def test_synthetic_engine_is_built_through_the_constructor():
+    engine = synthetic_engine(docs=20, dim=6)
+    assert engine.dimensions == 6
+    assert engine.has_vector.all()
+    assert np.allclose(np.linalg.norm(engine.matrix, axis=1), 1.0)
+    assert engine.search(engine.matrix[4], top_k=1)[0]["id"] == "synthetic_4"
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from scripts.mongo_bulk_export import (
+    MANIFEST_NAME,
+    MemoryCollection,
+    kb_document_to_mongo,
+    load_into,
+    profile_to_mongo,
+    verify_export,
+    write_bulk_export,
+)
+
+
+def kb_records(count, suffix=""):
+    docs = [{"id": f"doc{idx}.txt", "title": f"Doc {idx}", "content": f"resina iron {idx}{suffix}"} for idx in range(count)]
+    return [kb_document_to_mongo(doc, "model") for doc in docs]
+
+
+def profiles(count):
+    return [
+        profile_to_mongo(
+            {"id": f"iron__p{idx}", "resinId": "iron", "printerId": f"p{idx}", "status": "ok", "params": {"exposureTimeS": idx}}
+        )
+        for idx in range(count)
+    ]
+
+
+def test_records_are_split_into_bulk_sized_chunks(tmp_path):
+    entry = write_bulk_export(kb_records(7), tmp_path, "documents", "legacyId", chunk_size=3)
+
+    assert entry["documents"] == 7
+    assert [(item["file"], item["documents"]) for item in entry["files"]] == [
+        ("documents-0001.jsonl", 3),
+        ("documents-0002.jsonl", 3),
+        ("documents-0003.jsonl", 1),
+    ]
+    lines = (tmp_path / "documents-0003.jsonl").read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[0])["legacyId"] == "doc6.txt"
+
+    write_bulk_export(kb_records(2), tmp_path, "documents", "legacyId", chunk_size=3)
+    assert sorted(path.name for path in tmp_path.glob("documents-*.jsonl")) == ["documents-0001.jsonl"]
+
+
+def test_duplicate_and_missing_upsert_keys_are_rejected(tmp_path):
+    records = kb_records(2)
+    with pytest.raises(ValueError, match="Duplicate upsert key"):
+        write_bulk_export(records + records[:1], tmp_path, "documents", "legacyId")
+    with pytest.raises(ValueError, match="without upsert key"):
+        write_bulk_export([{"title": "sem chave"}], tmp_path, "documents", "legacyId")
+
+
+def test_verify_round_trips_both_collections(tmp_path):
+    write_bulk_export(kb_records(5), tmp_path, "documents", "legacyId", chunk_size=2)
+    write_bulk_export(profiles(4), tmp_path, "parametros", "id", chunk_size=3)
+
+    report = verify_export(tmp_path)
+    assert set(json.loads((tmp_path / MANIFEST_NAME).read_text(encoding="utf-8"))) == {"documents", "parametros"}
+    assert report["documents"] == {
+        "expected": 5,
+        "stored": 5,
+        "bulkWrites": 3,
+        "firstPassUpserted": 5,
+        "secondPassUpserted": 0,
+        "ok": True,
+    }
+    assert report["parametros"]["ok"] and report["parametros"]["bulkWrites"] == 2
+
+
+def test_reexport_only_modifies_records_whose_hash_changed(tmp_path):
+    collections = {"documents": MemoryCollection()}
+    write_bulk_export(kb_records(4), tmp_path, "documents", "legacyId")
+    load_into(collections, tmp_path)
+    stored = {doc["legacyId"]: doc["updatedAt"] for doc in collections["documents"].documents}
+
+    records = kb_records(4)
+    records[2] = kb_records(4, suffix=" editado")[2]
+    entry = write_bulk_export(records, tmp_path, "documents", "legacyId")
+    summary = load_into(collections, tmp_path)
+
+    assert entry["unchanged"] == 3
+    assert summary["documents"]["matched"] == 4
+    assert summary["documents"]["modified"] == 1
+    updated = {doc["legacyId"]: doc["updatedAt"] for doc in collections["documents"].documents}
+    assert [key for key in stored if updated[key] != stored[key]] == ["doc2.txt"]
@@ -0,0 +1,58 @@
+from scripts.import_print_params_from_html import generate_rag_digest
+from scripts.print_params_digest import COMING_SOON_TEXT, PARAM_LABELS, generate_grouped_digest
+
+PARAMS = {"layerHeightMm": 0.05, "exposureTimeS": 2.5, "uvOffDelayS": 0.5, "uvOffDelayBaseS": 1.0}
+
+
+def profile(resin, printer, status="ok", params=None):
+    return {
+        "id": f"{resin}__{printer}",
+        "resinId": resin,
+        "resinName": resin.title(),
+        "brand": "Elegoo",
+        "model": printer,
+        "status": status,
+        "params": params if status == "ok" else {},
+    }
+
+
+def test_grouped_rows_collapse_and_share_one_coming_soon_line():
+    profiles = [
+        profile("iron", "mars4", params=PARAMS),
+        profile("iron", "mars5", params=PARAMS),
+        profile("iron", "saturn", params={**PARAMS, "exposureTimeS": 3.0}),
+        profile("iron", "jupiter", status="coming_soon"),
+        profile("iron", "halot", status="coming_soon"),
+    ]
+    digest = generate_grouped_digest(profiles)
+
+    assert digest["stats"] == {"profiles": 5, "chunks": 1}
+    lines = digest["chunks"][0]["text"].splitlines()
+    assert lines[1] == "- Elegoo mars4, Elegoo mars5: altura de camada=0.05mm, tempo de exposição=2.5s, retardo UV=0.5s, retardo UV base=1.0s"
+    assert lines[2].startswith("- Elegoo saturn: ")
+    assert [line for line in lines if COMING_SOON_TEXT in line] == [f"- Elegoo jupiter, Elegoo halot: {COMING_SOON_TEXT}"]
+    assert lines[-1].endswith(COMING_SOON_TEXT)
+
+
+def test_large_tables_split_into_parts_covering_every_profile():
+    profiles = [
+        profile("iron", f"printer{idx}", params={**PARAMS, "exposureTimeS": float(idx)}) for idx in range(12)
+    ] + [profile("spark", "mars4", params=PARAMS)]
+    digest = generate_grouped_digest(profiles, max_chars=300)
+
+    iron = [chunk for chunk in digest["chunks"] if chunk["resin"] == "Iron"]
+    assert len(iron) > 1
+    assert [chunk["id"] for chunk in iron] == [f"iron__parte{number}" for number in range(1, len(iron) + 1)]
+    assert all(len(chunk["text"]) <= 300 for chunk in iron)
+    assert set(digest["profileToChunk"]) == {item["id"] for item in profiles}
+    for chunk in digest["chunks"]:
+        assert all(digest["profileToChunk"][profile_id] == chunk["id"] for profile_id in chunk["profileIds"])
+
+
+def test_per_profile_digest_uses_the_shared_field_list():
+    params = {key: 1 for key, _, _, _ in PARAM_LABELS}
+    chunks = generate_rag_digest([profile("iron", "mars4", params=params), profile("iron", "halot", status="coming_soon")])
+
+    assert all(f"{label}=" in chunks[0]["text"] for _, label, _, _ in PARAM_LABELS)
+    assert "retardo UV base=1s" in chunks[0]["text"]
+    assert chunks[1]["text"] == f"Resina Iron | Impressora Elegoo halot: {COMING_SOON_TEXT}"
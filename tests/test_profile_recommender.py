@@ -0,0 +1,43 @@
+from scripts.profile_recommender import build_fallback_table, lookup_fallback
+
+
+def _profile(resin, printer, brand, status="ok", exposure=2.0):
+    return {
+        "id": f"{resin}__{printer}",
+        "resinId": resin,
+        "printerId": printer,
+        "brand": brand,
+        "status": status,
+        "params": {"exposureTimeS": exposure, "baseExposureTimeS": 30.0, "layerHeightMm": 0.05} if status == "ok" else {},
+    }
+
+
+DATABASE = {
+    "resins": [{"id": "iron"}, {"id": "spark"}],
+    "printers": [
+        {"id": "elegoo__mars_4", "brand": "ELEGOO"},
+        {"id": "elegoo__mars_5", "brand": "ELEGOO"},
+        {"id": "anycubic__m5s", "brand": "ANYCUBIC"},
+    ],
+    "profiles": [
+        _profile("iron", "elegoo__mars_4", "ELEGOO", exposure=2.5),
+        _profile("spark", "elegoo__mars_4", "ELEGOO", exposure=1.8),
+        _profile("spark", "elegoo__mars_5", "ELEGOO", exposure=1.9),
+        _profile("spark", "anycubic__m5s", "ANYCUBIC", exposure=2.0),
+        _profile("iron", "anycubic__m5s", "ANYCUBIC", status="coming_soon"),
+    ],
+}
+
+
+def test_same_resin_suggestions_come_first():
+    table = build_fallback_table(DATABASE, k=3)
+    suggestions = lookup_fallback(table, "iron", "anycubic__m5s")
+    assert suggestions[0]["resinId"] == "iron"
+    assert suggestions[0]["sameResin"] is True
+    assert [item["sameResin"] for item in suggestions] == [True, False, False]
+
+
+def test_only_pairs_without_ok_profiles_are_listed():
+    table = build_fallback_table(DATABASE, k=2)
+    assert set(table["pairs"]) == {"iron__anycubic__m5s", "iron__elegoo__mars_5"}
+    assert all(len(items) == 2 for items in table["pairs"].values())